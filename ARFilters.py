@@ -1,97 +1,165 @@
 # ar_filters.py
+import argparse
+import time
+from collections import OrderedDict
 import cv2
 import numpy as np
+from facereco import FaceDetectionService
+from frame_source import open_source
+from model_registry import get_cascade
+
+class OverlayAssetCache:
+    # Decodes each PNG once, keeps it with premultiplied alpha and memoizes resized
+    # variants per (asset, size bucket) in a bounded LRU.
+    def __init__(self, paths, bucket=8, max_entries=64):
+        self.paths = paths
+        self.bucket = bucket
+        self.max_entries = max_entries
+        self.originals = {}
+        self.resized = OrderedDict()
+
+    def load(self, name):
+        if name not in self.originals:
+            image = cv2.imread(self.paths[name], cv2.IMREAD_UNCHANGED)
+            if image is None or image.ndim != 3 or image.shape[2] != 4:
+                raise FileNotFoundError(f"Overlay '{self.paths[name]}' is missing or has no alpha channel")
+            alpha = image[:, :, 3]
+            # Premultiply once so blending is just color + frame * (1 - alpha)
+            color = cv2.multiply(image[:, :, :3], cv2.merge([alpha, alpha, alpha]), scale=1 / 255.0)
+            self.originals[name] = (color, alpha.copy())
+        return self.originals[name]
+
+    def bucket_size(self, w, h):
+        b = self.bucket
+        return max(b, int(round(w / b)) * b), max(b, int(round(h / b)) * b)
+
+    def get(self, name, w, h):
+        # Returns (premultiplied BGR, 3-channel inverse alpha) at the bucketed size
+        size = self.bucket_size(w, h)
+        key = (name, size)
+        if key in self.resized:
+            self.resized.move_to_end(key)
+            return self.resized[key]
+
+        color, alpha = self.load(name)
+        color = cv2.resize(color, size, interpolation=cv2.INTER_AREA)
+        inv_alpha = 255 - cv2.resize(alpha, size, interpolation=cv2.INTER_AREA)
+        inv_alpha = cv2.merge([inv_alpha, inv_alpha, inv_alpha])
+        self.resized[key] = (color, inv_alpha)
+        if len(self.resized) > self.max_entries:
+            self.resized.popitem(last=False)
+        return self.resized[key]
+
+overlay_assets = OverlayAssetCache({
+    "sunglasses": "sunglasses.png",
+    "dog_nose": "dog_nose.png",
+    "dog_ears": "dog_ears.png",
+})
+
+def composite_overlay(frame, color, inv_alpha, x, y):
+    # frame = color + frame * (1 - alpha) on the ROI view, all channels at once with
+    # saturating uint8 OpenCV arithmetic. Parts of the overlay outside the frame are clipped.
+    h, w = color.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return frame
+
+    roi = frame[y0:y1, x0:x1]
+    ox, oy = x0 - x, y0 - y
+    color = color[oy:oy + y1 - y0, ox:ox + x1 - x0]
+    inv_alpha = inv_alpha[oy:oy + y1 - y0, ox:ox + x1 - x0]
+    cv2.add(color, cv2.multiply(roi, inv_alpha, scale=1 / 255.0), dst=roi)
+    return frame
 
 def apply_sunglasses_filter(frame, faces):
-    sunglasses = cv2.imread('sunglasses.png', cv2.IMREAD_UNCHANGED)
-    
     for (x, y, w, h) in faces:
-        # Calculate position for sunglasses
-        roi_gray = gray[y:y+h, x:x+w]
-        roi_color = frame[y:y+h, x:x+w]
-        
         # Adjust size and position of sunglasses
-        sw = w
-        sh = int(0.3 * h)
+        sw, sh = overlay_assets.bucket_size(w, int(0.3 * h))
         sy = y + int(0.25 * h)
         
-        if sy + sh > frame.shape[0] or x + sw > frame.shape[1]:
-            continue
-            
-        # Resize sunglasses
-        sunglasses_resized = cv2.resize(sunglasses, (sw, sh))
-        
-        # Extract alpha channel
-        alpha_s = sunglasses_resized[:, :, 3] / 255.0
-        alpha_l = 1.0 - alpha_s
-        
-        # Apply overlay
-        for c in range(0, 3):
-            frame[sy:sy+sh, x:x+sw, c] = (alpha_s * sunglasses_resized[:, :, c] + 
-                                         alpha_l * frame[sy:sy+sh, x:x+sw, c])
+        # Cached, pre-scaled sunglasses, clipped at the frame edges
+        color, inv_alpha = overlay_assets.get("sunglasses", sw, sh)
+        composite_overlay(frame, color, inv_alpha, x, sy)
     
     return frame
 
 def apply_dog_filter(frame, faces):
-    dog_nose = cv2.imread('dog_nose.png', cv2.IMREAD_UNCHANGED)
-    dog_ears = cv2.imread('dog_ears.png', cv2.IMREAD_UNCHANGED)
-    
     for (x, y, w, h) in faces:
         # Calculate position for dog nose
-        nose_w = int(w * 0.3)
-        nose_h = int(h * 0.2)
+        nose_w, nose_h = overlay_assets.bucket_size(int(w * 0.3), int(h * 0.2))
         nose_x = x + int(w * 0.35)
         nose_y = y + int(h * 0.6)
         
-        # Resize and apply dog nose
-        if nose_x + nose_w < frame.shape[1] and nose_y + nose_h < frame.shape[0]:
-            nose_resized = cv2.resize(dog_nose, (nose_w, nose_h))
-            alpha_s = nose_resized[:, :, 3] / 255.0
-            alpha_l = 1.0 - alpha_s
-            
-            for c in range(0, 3):
-                frame[nose_y:nose_y+nose_h, nose_x:nose_x+nose_w, c] = (
-                    alpha_s * nose_resized[:, :, c] + 
-                    alpha_l * frame[nose_y:nose_y+nose_h, nose_x:nose_x+nose_w, c]
-                )
+        # Apply dog nose
+        color, inv_alpha = overlay_assets.get("dog_nose", nose_w, nose_h)
+        composite_overlay(frame, color, inv_alpha, nose_x, nose_y)
         
         # Calculate position for dog ears
-        ears_w = int(w * 1.2)
-        ears_h = int(h * 0.8)
+        ears_w, ears_h = overlay_assets.bucket_size(int(w * 1.2), int(h * 0.8))
         ears_x = x - int(w * 0.1)
         ears_y = y - int(h * 0.5)
         
-        # Resize and apply dog ears
-        if ears_x + ears_w < frame.shape[1] and ears_y + ears_h < frame.shape[0] and ears_x >= 0 and ears_y >= 0:
-            ears_resized = cv2.resize(dog_ears, (ears_w, ears_h))
-            alpha_s = ears_resized[:, :, 3] / 255.0
-            alpha_l = 1.0 - alpha_s
-            
-            for c in range(0, 3):
-                frame[ears_y:ears_y+ears_h, ears_x:ears_x+ears_w, c] = (
-                    alpha_s * ears_resized[:, :, c] + 
-                    alpha_l * frame[ears_y:ears_y+ears_h, ears_x:ears_x+ears_w, c]
-                )
+        # Apply dog ears (often partly above the frame, so clipping matters here)
+        color, inv_alpha = overlay_assets.get("dog_ears", ears_w, ears_h)
+        composite_overlay(frame, color, inv_alpha, ears_x, ears_y)
     
     return frame
 
+def legacy_overlay(frame, overlay, x, y):
+    # Original per-channel float64 blend, kept for the benchmark only
+    h, w = overlay.shape[:2]
+    alpha_s = overlay[:, :, 3] / 255.0
+    alpha_l = 1.0 - alpha_s
+    for c in range(0, 3):
+        frame[y:y+h, x:x+w, c] = (alpha_s * overlay[:, :, c] +
+                                  alpha_l * frame[y:y+h, x:x+w, c])
+    return frame
+
+def benchmark_compositing(sizes=((64, 32), (200, 60), (320, 260)), iterations=500):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    for w, h in sizes:
+        overlay = rng.integers(0, 256, size=(h, w, 4), dtype=np.uint8)
+        alpha = overlay[:, :, 3]
+        color = cv2.multiply(overlay[:, :, :3], cv2.merge([alpha, alpha, alpha]), scale=1 / 255.0)
+        inv_alpha = cv2.merge([255 - alpha] * 3)
+
+        legacy_frame = frame.copy()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            legacy_overlay(legacy_frame, overlay, 100, 100)
+        legacy_ms = (time.perf_counter() - start) / iterations * 1000
+
+        new_frame = frame.copy()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            composite_overlay(new_frame, color, inv_alpha, 100, 100)
+        new_ms = (time.perf_counter() - start) / iterations * 1000
+
+        # One pass each from the same frame to check they agree
+        expected = legacy_overlay(frame.copy(), overlay, 100, 100)
+        actual = composite_overlay(frame.copy(), color, inv_alpha, 100, 100)
+        error = int(np.abs(expected.astype(np.int16) - actual).max())
+        print(f"{w}x{h}: loop {legacy_ms:.3f} ms, composite {new_ms:.3f} ms "
+              f"({legacy_ms / new_ms:.1f}x), max abs diff {error}")
+
 def ar_filters():
-    global gray
-    
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    cap = cv2.VideoCapture(0)
+    face_cascade = get_cascade('haarcascade_frontalface_default.xml')
+    face_service = FaceDetectionService(face_cascade, scale_factor=1.3, min_neighbors=5)
+    # Mirrored frames land directly in reused ring buffers; filters draw on them in place
+    source = open_source(0, mirror=True, writable=True)
     
     current_filter = "sunglasses"
     
     while True:
-        ret, frame = cap.read()
+        ret, frame = source.read()
         if not ret:
             break
             
-        frame = cv2.flip(frame, 1)
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        faces = face_service.detect(gray)
         
         if current_filter == "sunglasses":
             frame = apply_sunglasses_filter(frame, faces)
@@ -114,8 +182,16 @@ def ar_filters():
         elif key == 27:  # ESC key
             break
             
-    cap.release()
+    source.release()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    ar_filters()
+    parser = argparse.ArgumentParser(description="AR filters")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare the compositing kernel with the per-channel loop")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_compositing()
+    else:
+        ar_filters()
@@ -1,35 +1,243 @@
 # people_counter.py
+import argparse
+import time
 import cv2
 import numpy as np
+from frame_source import open_source
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+EVENT_DTYPE = np.dtype([("timestamp", np.float64), ("track_id", np.int64),
+                        ("zone", np.int16), ("direction", np.int8)])
+DIRECTION_IN = 1
+DIRECTION_OUT = -1
+
+class EventRingBuffer:
+    # Fixed-capacity store of counting events; the oldest are overwritten
+    def __init__(self, capacity=4096):
+        self.events = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.capacity = capacity
+        self.total = 0
+
+    def extend(self, timestamp, track_ids, zone, directions):
+        count = len(track_ids)
+        if count == 0:
+            return
+        if count > self.capacity:
+            track_ids, directions = track_ids[-self.capacity:], directions[-self.capacity:]
+            self.total += count - self.capacity
+            count = self.capacity
+        slots = (self.total + np.arange(count)) % self.capacity
+        self.events["timestamp"][slots] = timestamp
+        self.events["track_id"][slots] = track_ids
+        self.events["zone"][slots] = zone
+        self.events["direction"][slots] = directions
+        self.total += count
+
+    def latest(self, n=None):
+        # Events in chronological order, newest last
+        size = min(self.total, self.capacity)
+        n = size if n is None else min(n, size)
+        slots = (self.total - n + np.arange(n)) % self.capacity
+        return self.events[slots]
+
+def side_of_line(points, p1, p2):
+    # Sign of the cross product: > 0 left of p1->p2, < 0 right
+    return (p2[0] - p1[0]) * (points[:, 1] - p1[1]) - (p2[1] - p1[1]) * (points[:, 0] - p1[0])
+
+def points_in_polygon(points, polygon):
+    # Even-odd ray casting for all points against all polygon edges at once
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = straddles & (x < x_cross)
+    return (np.count_nonzero(crossings, axis=1) % 2) == 1
+
+class CountingLine:
+    # Moving from the left side of p1->p2 to the right counts as "in"
+    def __init__(self, name, p1, p2):
+        self.name = name
+        self.p1 = np.asarray(p1, dtype=np.float32)
+        self.p2 = np.asarray(p2, dtype=np.float32)
+        self.count_in = 0
+        self.count_out = 0
+
+    def crossings(self, moved_from, moved_to):
+        before = side_of_line(moved_from, self.p1, self.p2)
+        after = side_of_line(moved_to, self.p1, self.p2)
+        # The line's end points must also lie on opposite sides of each movement segment
+        p1_side = (moved_to[:, 0] - moved_from[:, 0]) * (self.p1[1] - moved_from[:, 1]) - \
+                  (moved_to[:, 1] - moved_from[:, 1]) * (self.p1[0] - moved_from[:, 0])
+        p2_side = (moved_to[:, 0] - moved_from[:, 0]) * (self.p2[1] - moved_from[:, 1]) - \
+                  (moved_to[:, 1] - moved_from[:, 1]) * (self.p2[0] - moved_from[:, 0])
+        crossed = (np.sign(before) != np.sign(after)) & (before != 0) & (np.sign(p1_side) != np.sign(p2_side))
+        directions = np.where(before > 0, DIRECTION_IN, DIRECTION_OUT).astype(np.int8)
+        return crossed, directions
+
+class CountingZone:
+    def __init__(self, name, polygon):
+        self.name = name
+        self.polygon = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+        self.occupancy = 0
+        self.count_in = 0
+        self.count_out = 0
+
+    def crossings(self, moved_from, moved_to):
+        was_inside = points_in_polygon(moved_from, self.polygon)
+        is_inside = points_in_polygon(moved_to, self.polygon)
+        crossed = was_inside != is_inside
+        directions = np.where(is_inside, DIRECTION_IN, DIRECTION_OUT).astype(np.int8)
+        return crossed, directions
+
+class CountingEngine:
+    # Directional counts for lines and zones on top of PeopleCounter tracks
+    def __init__(self, lines=(), zones=(), capacity=4096):
+        self.regions = list(lines) + list(zones)
+        self.zones = list(zones)
+        self.events = EventRingBuffer(capacity)
+
+    def process(self, counter, timestamp):
+        for index, region in enumerate(self.regions):
+            if len(counter.moved_ids):
+                crossed, directions = region.crossings(counter.moved_from, counter.moved_to)
+                directions = directions[crossed]
+                region.count_in += int(np.count_nonzero(directions == DIRECTION_IN))
+                region.count_out += int(np.count_nonzero(directions == DIRECTION_OUT))
+                self.events.extend(timestamp, counter.moved_ids[crossed], index, directions)
+
+        if self.zones:
+            positions = np.array(list(counter.centroids.values()), dtype=np.float32).reshape(-1, 2)
+            for zone in self.zones:
+                zone.occupancy = int(np.count_nonzero(points_in_polygon(positions, zone.polygon)))
+
+    def region_name(self, index):
+        return self.regions[index].name
+
+    def draw(self, frame):
+        y = 60
+        for region in self.regions:
+            if isinstance(region, CountingZone):
+                cv2.polylines(frame, [region.polygon.astype(np.int32)], True, (255, 0, 0), 2)
+                text = f"{region.name}: in {region.count_in} out {region.count_out} occupancy {region.occupancy}"
+            else:
+                cv2.line(frame, tuple(map(int, region.p1)), tuple(map(int, region.p2)), (0, 255, 255), 2)
+                text = f"{region.name}: in {region.count_in} out {region.count_out}"
+            cv2.putText(frame, text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            y += 25
 
 class PeopleCounter:
-    def __init__(self):
+    def __init__(self, max_distance=80, counting=None, scale=1.0):
         self.background_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
         self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
         self.people_count = 0
-        self.centroids = []
+        self.centroids = {}  # object id -> (x, y)
         self.max_disappeared = 50
-        self.disappeared = {}
+        self.max_distance = max_distance
+        self.disappeared = {}  # object id -> frames since last match
         self.next_object_id = 0
-        
-    def update(self, centroid):
-        object_ids = list(self.disappeared.keys())
-        object_centroids = [self.centroids[i] for i in object_ids]
-        
-        if len(object_centroids) == 0:
-            for i in range(len(centroid)):
-                self.disappeared[self.next_object_id] = 0
-                self.centroids[self.next_object_id] = centroid[i]
-                self.next_object_id += 1
-                self.people_count += 1
+        self.moved_ids = np.zeros(0, dtype=np.int64)
+        self.moved_from = self.moved_to = np.zeros((0, 2), dtype=np.float32)
+        self.counting = counting
+        # Segmentation runs on a frame resized by this factor; areas scale with its square
+        self.scale = scale
+        self.min_area = 500 * scale * scale
+
+    def register(self, centroid):
+        self.centroids[self.next_object_id] = centroid
+        self.disappeared[self.next_object_id] = 0
+        self.next_object_id += 1
+        self.people_count += 1
+
+    def deregister(self, object_id):
+        del self.centroids[object_id]
+        del self.disappeared[object_id]
+
+    def match(self, distances):
+        # Returns matched (row, col) index arrays, rows = tracks, cols = detections
+        if linear_sum_assignment is not None:
+            rows, cols = linear_sum_assignment(distances)
+            gated = distances[rows, cols] <= self.max_distance
+            return rows[gated], cols[gated]
+
+        # Greedy: each round every free track claims its closest free detection,
+        # conflicts go to the closer track and losers retry in the next round
+        free_rows = np.arange(distances.shape[0])
+        free_cols = np.arange(distances.shape[1])
+        matched_rows, matched_cols = [], []
+        while len(free_rows) and len(free_cols):
+            sub = distances[np.ix_(free_rows, free_cols)]
+            rows = sub.min(axis=1).argsort()
+            cols = sub.argmin(axis=1)[rows]
+            _, first = np.unique(cols, return_index=True)
+            rows, cols = rows[first], cols[first]
+            gated = sub[rows, cols] <= self.max_distance
+            if not gated.any():
+                break
+            rows, cols = rows[gated], cols[gated]
+            matched_rows.append(free_rows[rows])
+            matched_cols.append(free_cols[cols])
+            free_rows = np.delete(free_rows, rows)
+            free_cols = np.delete(free_cols, cols)
+
+        if not matched_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+    def update(self, centroids):
+        object_ids = np.fromiter(self.centroids.keys(), dtype=np.int64, count=len(self.centroids))
+        input_centroids = np.asarray(centroids, dtype=np.float32).reshape(-1, 2)
+
+        # Movement of tracks matched this frame, used by the counting engine
+        self.moved_ids = np.zeros(0, dtype=np.int64)
+        self.moved_from = self.moved_to = np.zeros((0, 2), dtype=np.float32)
+
+        if len(object_ids) == 0:
+            for centroid in map(tuple, input_centroids.tolist()):
+                self.register(centroid)
+            return self.people_count
+
+        object_centroids = np.array(list(self.centroids.values()), dtype=np.float32).reshape(-1, 2)
+        if len(input_centroids):
+            # (tracks, detections) Euclidean distance matrix
+            distances = np.linalg.norm(object_centroids[:, None, :] - input_centroids[None, :, :], axis=2)
+            rows, cols = self.match(distances)
         else:
-            pass  # Simplified version - in practice you'd implement tracking logic
-        
+            rows = cols = np.zeros(0, dtype=np.int64)
+
+        self.moved_ids = object_ids[rows]
+        self.moved_from = object_centroids[rows]
+        self.moved_to = input_centroids[cols]
+        for object_id, col in zip(object_ids[rows].tolist(), cols.tolist()):
+            self.centroids[object_id] = tuple(input_centroids[col].tolist())
+            self.disappeared[object_id] = 0
+
+        unmatched_tracks = np.ones(len(object_ids), dtype=bool)
+        unmatched_tracks[rows] = False
+        for object_id in object_ids[unmatched_tracks].tolist():
+            self.disappeared[object_id] += 1
+            if self.disappeared[object_id] > self.max_disappeared:
+                self.deregister(object_id)
+
+        unmatched_detections = np.ones(len(input_centroids), dtype=bool)
+        unmatched_detections[cols] = False
+        for centroid in map(tuple, input_centroids[unmatched_detections].tolist()):
+            self.register(centroid)
+
         return self.people_count
 
     def count_people(self, frame):
+        small = frame if self.scale == 1.0 else cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                                                           interpolation=cv2.INTER_AREA)
+
         # Apply background subtraction
-        fg_mask = self.background_subtractor.apply(frame)
+        fg_mask = self.background_subtractor.apply(small)
         fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self.kernel)
         
         # Find contours
@@ -38,11 +246,12 @@ class PeopleCounter:
         centroids = []
         for contour in contours:
             # Filter small contours
-            if cv2.contourArea(contour) < 500:
+            if cv2.contourArea(contour) < self.min_area:
                 continue
                 
-            # Get bounding box
+            # Get bounding box, mapped back to full resolution
             x, y, w, h = cv2.boundingRect(contour)
+            x, y, w, h = int(x / self.scale), int(y / self.scale), int(w / self.scale), int(h / self.scale)
             
             # Calculate centroid
             centroid_x = int(x + w/2)
@@ -59,18 +268,26 @@ class PeopleCounter:
         # Display count
         cv2.putText(frame, f"People Count: {count}", (10, 30), 
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+        if self.counting is not None:
+            self.counting.process(self, time.time())
+            self.counting.draw(frame)
         
         return frame, count
 
-def people_counter():
-    cap = cv2.VideoCapture(0)
-    counter = PeopleCounter()
+def people_counter(counting=None, scale=1.0, source=0):
+    cap = open_source(source, writable=True)
+    counter = PeopleCounter(counting=counting, scale=scale)
     
     while True:
         ret, frame = cap.read()
         if not ret:
             break
             
+        if not frame.flags.writeable:
+            # Frames shared with other processes are read-only; draw on a private copy
+            frame = frame.copy()
+            
         frame, count = counter.count_people(frame)
         
         cv2.imshow("People Counter", frame)
@@ -82,5 +299,82 @@ def people_counter():
     cap.release()
     cv2.destroyAllWindows()
 
+def benchmark_tracker(num_people=100, frames=500, step=3.0, seed=0):
+    # Synthetic crowd: random walk with people entering and leaving
+    rng = np.random.default_rng(seed)
+    counter = PeopleCounter()
+    positions = rng.uniform(0, 1000, size=(num_people, 2))
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        positions += rng.normal(0, step, size=positions.shape)
+        visible = rng.random(num_people) > 0.05
+        counter.update(positions[visible])
+    elapsed = time.perf_counter() - start
+
+    print(f"{num_people} people, {frames} frames: {elapsed / frames * 1000:.3f} ms/frame, "
+          f"{len(counter.centroids)} active tracks, {counter.people_count} registered "
+          f"({'hungarian' if linear_sum_assignment is not None else 'greedy'} assignment)")
+
+def synthetic_frames(count=200, width=640, height=480, people=8, seed=0):
+    # Noisy background with moving blobs standing in for people
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+    positions = rng.uniform([0, 0], [width - 40, height - 80], size=(people, 2))
+    velocities = rng.normal(0, 4, size=(people, 2))
+    for _ in range(count):
+        positions = np.clip(positions + velocities, 0, [width - 40, height - 80])
+        frame = background.copy()
+        for x, y in positions.astype(int):
+            cv2.rectangle(frame, (x, y), (x + 40, y + 80), (200, 200, 200), -1)
+        yield frame
+
+def benchmark_scales(source=None, scales=(1.0, 0.5, 0.25), frames=200):
+    if source is None:
+        clip = list(synthetic_frames(frames))
+    else:
+        cap = cv2.VideoCapture(source)
+        clip = []
+        while len(clip) < frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            clip.append(frame)
+        cap.release()
+
+    for scale in scales:
+        counter = PeopleCounter(scale=scale)
+        start = time.perf_counter()
+        for frame in clip:
+            counter.count_people(frame.copy())
+        elapsed = time.perf_counter() - start
+        print(f"scale {scale:.2f}x: {elapsed / len(clip) * 1000:.2f} ms/frame, {counter.people_count} registered")
+
 if __name__ == "__main__":
-    people_counter()
+    parser = argparse.ArgumentParser(description="People counter")
+    parser.add_argument("--benchmark", action="store_true", help="benchmark the tracker on synthetic crowds")
+    parser.add_argument("--source", default="0",
+                        help="camera index, video file, image folder or shm:<name> published by frame_source.py")
+    parser.add_argument("--scale", type=float, default=1.0, help="processing scale for segmentation")
+    parser.add_argument("--benchmark-scale", nargs="?", const="", metavar="CLIP",
+                        help="per-frame time at 1x, 0.5x and 0.25x on a clip (synthetic frames if omitted)")
+    parser.add_argument("--line", action="append", default=[], metavar="X1,Y1,X2,Y2",
+                        help="counting line; crossing from its left to its right counts as 'in' (repeatable)")
+    parser.add_argument("--zone", action="append", default=[], metavar="X1,Y1,X2,Y2,X3,Y3,...",
+                        help="counting zone polygon (repeatable)")
+    args = parser.parse_args()
+
+    lines = []
+    for i, spec in enumerate(args.line):
+        x1, y1, x2, y2 = map(float, spec.split(","))
+        lines.append(CountingLine(f"line{i}", (x1, y1), (x2, y2)))
+    zones = [CountingZone(f"zone{i}", list(map(float, spec.split(",")))) for i, spec in enumerate(args.zone)]
+    counting = CountingEngine(lines, zones) if lines or zones else None
+
+    if args.benchmark:
+        for num_people in (10, 100, 300):
+            benchmark_tracker(num_people)
+    elif args.benchmark_scale is not None:
+        benchmark_scales(args.benchmark_scale or None)
+    else:
+        people_counter(counting, args.scale, args.source)
@@ -0,0 +1,171 @@
+# batch_processor.py
+# Headless processing of recorded clips with any of the detectors, spread over a process pool
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+import cv2
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".h264")
+
+# Set once per worker process by init_worker(); models are cached in model_registry, so
+# building a detector per clip is cheap and keeps tracker state from leaking between clips
+detector_name = None
+detector_options = None
+
+def make_face_detector(options):
+    from facereco import load_face_cascade, detect_faces
+    face_cascade = load_face_cascade()
+
+    def detect(frame):
+        return [{"label": "face", "confidence": 1.0, "box": [int(v) for v in box]}
+                for box in detect_faces(face_cascade, frame)]
+    return detect
+
+def make_people_detector(options):
+    from Peoplecounter import PeopleCounter
+    counter = PeopleCounter(scale=options.get("scale", 1.0))
+
+    def detect(frame):
+        count = counter.count_people(frame)[1]
+        return [{"label": "person", "track_id": int(object_id), "centroid": [float(x), float(y)],
+                 "count": count}
+                for object_id, (x, y) in counter.centroids.items() if counter.disappeared[object_id] == 0]
+    return detect
+
+def make_object_detector(options):
+    from objectdetector import load_model
+    model = load_model(options.get("model", "yolov3"), options.get("backend", "default"))
+
+    def detect(frame):
+        boxes, confidences, class_ids, _ = model.detect(frame)
+        return [{"label": model.classes[class_id], "confidence": float(confidence), "box": box.tolist()}
+                for box, confidence, class_id in zip(boxes, confidences, class_ids)]
+    return detect
+
+def make_document_detector(options):
+    from docuscanner import find_document
+
+    def detect(frame):
+        screenCnt, _ = find_document(frame)
+        if screenCnt is None:
+            return []
+        return [{"label": "document", "confidence": 1.0, "corners": screenCnt.reshape(4, 2).tolist()}]
+    return detect
+
+DETECTORS = {
+    "faces": make_face_detector,
+    "people": make_people_detector,
+    "objects": make_object_detector,
+    "document": make_document_detector,
+}
+
+def init_worker(name, options):
+    global detector_name, detector_options
+    # One OpenCV thread per process; the pool provides the parallelism
+    cv2.setNumThreads(1)
+    detector_name, detector_options = name, options
+    # Warm the model cache so the first clip is not charged for loading
+    DETECTORS[name](options)
+
+def find_clips(path):
+    if os.path.isfile(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if name.lower().endswith(VIDEO_EXTENSIONS))
+
+def process_clip(path):
+    # Fresh detector state (background model, track ids, counts) for every clip
+    detector = DETECTORS[detector_name](detector_options)
+    cap = cv2.VideoCapture(path)
+    clip_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    records = []
+    frame_index = 0
+    start = time.perf_counter()
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        detections = detector(frame)
+        if detections:
+            records.append({"clip": path, "frame": frame_index,
+                            "time": frame_index / clip_fps if clip_fps else None,
+                            "detections": detections})
+        frame_index += 1
+
+    cap.release()
+    elapsed = time.perf_counter() - start
+    return {"clip": path, "worker": os.getpid(), "frames": frame_index, "elapsed": elapsed,
+            "clip_fps": clip_fps, "records": records}
+
+class ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", newline="")
+        self.csv = None
+        if path.lower().endswith(".csv"):
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(["clip", "frame", "time", "label", "confidence", "detail"])
+
+    def write(self, records):
+        for record in records:
+            if self.csv is None:
+                self.file.write(json.dumps(record) + "\n")
+                continue
+            for detection in record["detections"]:
+                detail = {k: v for k, v in detection.items() if k not in ("label", "confidence")}
+                self.csv.writerow([record["clip"], record["frame"], record["time"], detection["label"],
+                                   detection.get("confidence", ""), json.dumps(detail)])
+
+    def close(self):
+        self.file.close()
+
+def batch_process(input_path, detector_name, output, workers=None, options=None):
+    clips = find_clips(input_path)
+    if not clips:
+        print(f"No video clips found in {input_path}")
+        return
+
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(output)
+    per_worker = {}
+    total_frames = 0
+    video_seconds = 0.0
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(detector_name, options or {})) as pool:
+        for result in pool.imap_unordered(process_clip, clips):
+            writer.write(result["records"])
+            frames, elapsed = per_worker.get(result["worker"], (0, 0.0))
+            per_worker[result["worker"]] = (frames + result["frames"], elapsed + result["elapsed"])
+            total_frames += result["frames"]
+            if result["clip_fps"]:
+                video_seconds += result["frames"] / result["clip_fps"]
+            print(f"{result['clip']}: {result['frames']} frames, "
+                  f"{result['frames'] / max(result['elapsed'], 1e-9):.1f} FPS")
+
+    writer.close()
+    wall = time.perf_counter() - start
+    print(f"Processed {len(clips)} clips, {total_frames} frames in {wall:.1f} s "
+          f"({total_frames / wall:.1f} FPS overall"
+          + (f", {video_seconds / wall:.1f}x real time)" if video_seconds else ")"))
+    for worker, (frames, elapsed) in sorted(per_worker.items()):
+        print(f"  worker {worker}: {frames} frames, {frames / max(elapsed, 1e-9):.1f} FPS")
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless batch processing of recorded video")
+    parser.add_argument("input", help="video file or directory of clips")
+    parser.add_argument("--detector", choices=list(DETECTORS), required=True)
+    parser.add_argument("--output", default="results.jsonl", help="output file (.jsonl or .csv)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--model", default="yolov3", help="model for --detector objects")
+    parser.add_argument("--backend", default="default", help="DNN backend for --detector objects")
+    parser.add_argument("--scale", type=float, default=1.0, help="processing scale for --detector people")
+    args = parser.parse_args()
+
+    batch_process(args.input, args.detector, args.output, args.workers,
+                  {"model": args.model, "backend": args.backend, "scale": args.scale})
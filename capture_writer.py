@@ -0,0 +1,159 @@
+# capture_writer.py
+# Background still-image capture: frames are handed to a small encode pool through a bounded
+# number of slots, encoded as JPEG/PNG/WebP and written atomically (temp file + rename).
+# The caller never waits on encoding, disk or the shutter sound; a full pool drops the capture.
+import argparse
+import datetime
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+FORMATS = {
+    "jpg": lambda quality, compression: [cv2.IMWRITE_JPEG_QUALITY, quality],
+    "png": lambda quality, compression: [cv2.IMWRITE_PNG_COMPRESSION, compression],
+    "webp": lambda quality, compression: [cv2.IMWRITE_WEBP_QUALITY, quality],
+}
+
+def current_umask():
+    # os.umask can only be read by setting it; call before worker threads create files
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+class CaptureWriter:
+    def __init__(self, output_dir="selfies", prefix="selfie", fmt="jpg", quality=95, png_compression=3,
+                 workers=2, queue_size=4, burst_seconds=0.0, sound=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown image format '{fmt}', choose from: {', '.join(FORMATS)}")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.extension = "." + fmt
+        self.params = FORMATS[fmt](quality, png_compression)
+        self.sound = sound
+        # mkstemp creates 0600 files; saved images get the usual permissions instead
+        self.file_mode = 0o666 & ~current_umask()
+        # Disambiguates captures within the same millisecond
+        self.sequence = itertools.count()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capture")
+        # Frames waiting or being encoded; bounds memory without a blocking queue
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+        # Burst mode: after a trigger, keep the best-scoring frame seen within burst_seconds
+        self.burst_seconds = burst_seconds
+        self.burst_deadline = None
+        self.burst_frame = None
+        self.burst_score = None
+
+        self.lock = threading.Lock()
+        self.saved = 0
+        self.dropped = 0
+        self.failed = 0
+        self.encode_seconds = 0.0
+
+    def update(self, frame, score, fired, now=None):
+        # Call once per frame from the capture loop. Only copies a frame when it may be saved.
+        now = time.monotonic() if now is None else now
+        if self.burst_deadline is not None:
+            if score > self.burst_score:
+                np.copyto(self.burst_frame, frame)
+                self.burst_score = score
+            if now >= self.burst_deadline:
+                self.submit(self.burst_frame, self.burst_score)
+                self.burst_deadline = self.burst_frame = None
+            return
+        if not fired:
+            return
+        if self.burst_seconds > 0:
+            self.burst_frame = frame.copy()
+            self.burst_score = score
+            self.burst_deadline = now + self.burst_seconds
+        else:
+            self.submit(frame.copy(), score)
+
+    def submit(self, frame, score=None):
+        # `frame` is owned by the writer from here on
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.dropped += 1
+            print("Capture dropped: encoder busy")
+            return False
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        path = os.path.join(self.output_dir, f"{self.prefix}_{timestamp}_{next(self.sequence):04d}{self.extension}")
+        self.pool.submit(self.write, frame, path)
+        return True
+
+    def write(self, frame, path):
+        try:
+            start = time.perf_counter()
+            ok, encoded = cv2.imencode(self.extension, frame, self.params)
+            if not ok:
+                raise RuntimeError(f"Encoding {self.extension} failed")
+            # Readers never see a partial file: write a unique temp file next to the target,
+            # then rename it into place
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", prefix=".", dir=self.output_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(encoded.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(temp_path, self.file_mode)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            with self.lock:
+                self.saved += 1
+                self.encode_seconds += time.perf_counter() - start
+            print(f"Selfie saved as {path}")
+            if self.sound:
+                self.sound.play()
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+            print(f"Saving {path} failed: {e}")
+        finally:
+            self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            mean_ms = self.encode_seconds / self.saved * 1000 if self.saved else 0.0
+            return {"saved": self.saved, "dropped": self.dropped, "failed": self.failed, "write_ms": mean_ms}
+
+    def close(self):
+        # Flush a pending burst and wait for queued writes
+        if self.burst_deadline is not None:
+            self.submit(self.burst_frame, self.burst_score)
+            self.burst_deadline = self.burst_frame = None
+        self.pool.shutdown(wait=True)
+
+def benchmark_formats(count=20, width=1280, height=720):
+    # Time spent in the capture loop vs. in the pool, per format
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), (0, 0), 3)
+    for fmt, options in (("jpg", {"quality": 95}), ("png", {"png_compression": 1}),
+                         ("png", {"png_compression": 9}), ("webp", {"quality": 90})):
+        with tempfile.TemporaryDirectory() as folder:
+            writer = CaptureWriter(folder, fmt=fmt, queue_size=count, **options)
+            start = time.perf_counter()
+            for i in range(count):
+                writer.update(frame, 1.0, fired=True, now=i)
+            caller_ms = (time.perf_counter() - start) / count * 1000
+            writer.close()
+            stats = writer.stats()
+            size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+            size = size / stats["saved"] if stats["saved"] else 0.0
+            print(f"{fmt:<5}{str(options):<24}caller {caller_ms:.2f} ms, write {stats['write_ms']:.1f} ms, "
+                  f"{size / 1024:.0f} KiB/image, {stats['saved']}/{count} saved")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture writer format benchmark")
+    parser.add_argument("--count", type=int, default=20)
+    args = parser.parse_args()
+
+    benchmark_formats(args.count)
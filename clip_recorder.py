@@ -0,0 +1,131 @@
+# clip_recorder.py
+# Event-triggered clip recording. Frames are JPEG-encoded into a fixed-length pre-roll on a
+# background thread; a trigger writes the pre-roll plus the following seconds to disk.
+import datetime
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+class ClipRecorder:
+    def __init__(self, fps=20.0, pre_seconds=5.0, post_seconds=5.0, max_clip_seconds=120.0,
+                 output_dir="recordings", jpeg_quality=80, fourcc="mp4v", extension=".mp4", queue_size=8):
+        self.fps = fps
+        self.post_seconds = post_seconds
+        self.max_clip_seconds = max_clip_seconds
+        self.output_dir = output_dir
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.extension = extension
+
+        # Memory stays fixed: the pre-roll holds at most pre_seconds * fps encoded frames
+        # and the hand-off queue drops the oldest frame when the worker falls behind
+        self.pre_roll = deque(maxlen=max(1, int(pre_seconds * fps)))
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.frames_dropped = 0
+        self.clips_written = 0
+        # Disambiguates clips opened within the same millisecond (a continuation after
+        # max_clip_seconds opens on the very next frame)
+        self.sequence = itertools.count()
+
+        self.trigger_time = None
+        self.writer = None
+        self.clip_path = None
+        self.clip_start = None
+        self.running = True
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def push(self, frame):
+        # Called from the detection loop; never blocks. The frame must not be modified afterwards.
+        while True:
+            try:
+                self.frames.put_nowait((time.monotonic(), frame))
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def trigger(self):
+        # Starts a clip, or extends the current one by post_seconds
+        self.trigger_time = time.monotonic()
+
+    @property
+    def recording(self):
+        return self.writer is not None
+
+    def run(self):
+        while self.running or not self.frames.empty():
+            try:
+                timestamp, frame = self.frames.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                self.handle(timestamp, frame)
+            except Exception as e:
+                print(f"Clip recorder error: {e}")
+
+    def handle(self, timestamp, frame):
+        triggered = self.trigger_time is not None and timestamp - self.trigger_time <= self.post_seconds
+        if self.writer is None and triggered:
+            self.open_clip(frame)
+
+        if self.writer is None:
+            ok, encoded = cv2.imencode(".jpg", frame, self.encode_params)
+            if ok:
+                self.pre_roll.append(encoded)
+            return
+
+        self.writer.write(frame)
+        if not triggered or timestamp - self.clip_start > self.max_clip_seconds:
+            self.close_clip()
+
+    def open_clip(self, frame):
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        self.clip_path = os.path.join(self.output_dir, f"motion_{timestamp}_{next(self.sequence):04d}{self.extension}")
+        height, width = frame.shape[:2]
+        self.writer = cv2.VideoWriter(self.clip_path, self.fourcc, self.fps, (width, height))
+        self.clip_start = time.monotonic()
+
+        # Pre-roll first, oldest frame first
+        while self.pre_roll:
+            decoded = cv2.imdecode(self.pre_roll.popleft(), cv2.IMREAD_COLOR)
+            if decoded is not None and decoded.shape[:2] == (height, width):
+                self.writer.write(decoded)
+
+    def close_clip(self):
+        self.writer.release()
+        self.writer = None
+        self.clips_written += 1
+        print(f"Motion clip saved as {self.clip_path}")
+
+    def pre_roll_bytes(self):
+        return sum(encoded.nbytes for encoded in self.pre_roll)
+
+    def stop(self):
+        self.running = False
+        self.worker.join(timeout=2.0)
+        if self.writer is not None:
+            self.close_clip()
+
+if __name__ == "__main__":
+    # Smoke test on synthetic frames: one trigger in the middle of a 10 second stream
+    recorder = ClipRecorder(fps=20, pre_seconds=2, post_seconds=2)
+    rng = np.random.default_rng(0)
+    for i in range(200):
+        frame = rng.integers(0, 255, size=(240, 320, 3), dtype=np.uint8)
+        recorder.push(frame)
+        if i == 100:
+            recorder.trigger()
+        time.sleep(1 / 20)
+    recorder.stop()
+    print(f"{recorder.clips_written} clips, {recorder.frames_dropped} frames dropped, "
+          f"pre-roll {recorder.pre_roll_bytes() / 1024:.0f} KiB")
@@ -0,0 +1,199 @@
+# event_dispatch.py
+# Motion events go through a bounded queue to a worker thread that debounces and
+# rate-limits them before handing alarms to pluggable sinks (sound, log file, webhook).
+import json
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import wave
+from collections import namedtuple
+
+MotionEvent = namedtuple("MotionEvent", ["timestamp", "boxes", "area", "frame_index"])
+
+class RateLimiter:
+    # Token bucket: `rate` events per second on average, bursts of up to `burst`
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        # Set by the first call, so callers may use any clock as long as they stick to it
+        self.last = None
+
+    def allow(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.last is not None:
+            self.tokens = min(self.burst, self.tokens + max(0.0, now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class SoundSink:
+    # winsound on Windows; on Linux plays a generated beep (or `sound_file`) through
+    # aplay/paplay, falling back to the terminal bell. Playback is fire-and-forget.
+    def __init__(self, frequency=500, duration_ms=100, sound_file=None):
+        self.enabled = True
+        self.frequency = frequency
+        self.duration_ms = duration_ms
+        self.sound_file = sound_file if sound_file and os.path.exists(sound_file) else None
+        self.player = None
+        self.wav_path = None
+        if sys.platform != "win32":
+            self.player = shutil.which("paplay") or shutil.which("aplay")
+            if self.player and not self.sound_file:
+                self.wav_path = self.write_beep()
+
+    def write_beep(self, sample_rate=16000):
+        samples = int(sample_rate * self.duration_ms / 1000)
+        period = sample_rate / self.frequency
+        frames = b"".join(struct.pack("<h", 8000 if (i % period) < period / 2 else -8000) for i in range(samples))
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="alarm_")
+        with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(frames)
+        return path
+
+    def handle(self, event, count):
+        self.play()
+
+    def play(self):
+        if not self.enabled:
+            return
+        if sys.platform == "win32":
+            import winsound
+            if self.sound_file:
+                winsound.PlaySound(self.sound_file, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            else:
+                winsound.Beep(self.frequency, self.duration_ms)
+        elif self.player:
+            subprocess.Popen([self.player, self.sound_file or self.wav_path],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            sys.stdout.write("\a")
+            sys.stdout.flush()
+
+    def close(self):
+        if self.wav_path and os.path.exists(self.wav_path):
+            os.remove(self.wav_path)
+
+class LogFileSink:
+    def __init__(self, path="motion_events.log"):
+        self.enabled = True
+        self.file = open(path, "a")
+
+    def handle(self, event, count):
+        self.file.write(json.dumps({"timestamp": event.timestamp, "frame": event.frame_index,
+                                    "boxes": [list(map(int, box)) for box in event.boxes],
+                                    "area": event.area, "coalesced": count}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class WebhookSink:
+    # POSTs alarms as JSON to a local endpoint; failures are reported, never raised
+    def __init__(self, url="http://127.0.0.1:8080/motion", timeout=1.0):
+        self.enabled = True
+        self.url = url
+        self.timeout = timeout
+        self.failures = 0
+
+    def handle(self, event, count):
+        body = json.dumps({"timestamp": event.timestamp, "frame": event.frame_index,
+                           "boxes": len(event.boxes), "area": event.area, "coalesced": count}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except OSError as e:
+            self.failures += 1
+            print(f"Webhook {self.url} failed: {e}")
+
+    def close(self):
+        pass
+
+class EventDispatcher:
+    # Events closer together than `debounce` seconds belong to one incident and raise a
+    # single alarm; an incident that lasts longer alarms again every `realarm` seconds.
+    # Alarms are further limited to `rate` per second; an alarm the limiter holds back stays
+    # pending and is sent as soon as a token is free. Event timestamps are time.time().
+    def __init__(self, sinks, debounce=1.0, rate=0.5, burst=1, queue_size=64, realarm=30.0):
+        self.sinks = list(sinks)
+        self.debounce = debounce
+        self.realarm = realarm
+        self.limiter = RateLimiter(rate, burst)
+        self.events = queue.Queue(maxsize=queue_size)
+        self.last_event_time = None
+        self.last_alarm_time = None
+        self.pending = None  # first event of an incident whose alarm is waiting for the limiter
+        self.coalesced = 0
+        self.events_received = 0
+        self.events_dropped = 0
+        self.alarms_sent = 0
+        self.running = True
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def publish(self, event):
+        # Never blocks the detection thread; a full queue drops the event
+        self.events_received += 1
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.events_dropped += 1
+
+    def run(self):
+        while self.running:
+            try:
+                event = self.events.get(timeout=0.2)
+            except queue.Empty:
+                # Motion may have stopped; a held-back alarm is still owed
+                if self.pending is not None:
+                    self.send_pending(time.time())
+                continue
+            self.process(event)
+
+    def process(self, event):
+        new_incident = self.last_event_time is None or event.timestamp - self.last_event_time > self.debounce
+        self.last_event_time = event.timestamp
+        # Continuous motion never leaves the incident, so re-arm after `realarm` seconds
+        due = new_incident or (self.last_alarm_time is not None and self.realarm
+                               and event.timestamp - self.last_alarm_time >= self.realarm)
+        if self.pending is not None:
+            self.coalesced += 1
+        elif due:
+            self.pending = event
+        else:
+            self.coalesced += 1
+            return
+        self.send_pending(event.timestamp)
+
+    def send_pending(self, now):
+        if not self.limiter.allow(now):
+            # Stays pending; retried on the next event or idle tick
+            return
+        event, self.pending = self.pending, None
+        self.last_alarm_time = now
+        count, self.coalesced = self.coalesced, 0
+        self.alarms_sent += 1
+        for sink in self.sinks:
+            if sink.enabled:
+                try:
+                    sink.handle(event, count)
+                except Exception as e:
+                    print(f"Alarm sink {type(sink).__name__} failed: {e}")
+
+    def stop(self):
+        self.running = False
+        self.worker.join(timeout=1.0)
+        for sink in self.sinks:
+            sink.close()
@@ -1,22 +1,268 @@
+import argparse
+import time
 import cv2
+import numpy as np
+from model_registry import get_cascade, get_dnn, registry, resolve_path
+from objectdetector import box_iou, decode_ssd_outputs
 
-face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
-webcam = cv2.VideoCapture(0)
+def load_face_cascade():
+    return get_cascade('haarcascade_frontalface_default.xml')
 
-while True:
-    _, img = webcam.read()
+def detect_faces(face_cascade, img):
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.5, 4)
-    
-    for (x, y, w, h) in faces:
-        cv2.rectangle(img, (x, y), (x+w, y+h), (0, 255, 0), 3)
-    
-    cv2.imshow("Face detection", img)
-    
-    key = cv2.waitKey(10)
-
-    if key == 27:  # ESC key to break
-        break
-
-webcam.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+    return face_cascade.detectMultiScale(gray, 1.5, 4)
+
+class FaceDetectionService:
+    # Searches padded regions around known faces and only scans the full frame every
+    # `full_scan_interval` frames, when nothing is tracked, or after a track is lost.
+    def __init__(self, face_cascade, scale_factor=1.5, min_neighbors=4, full_scan_interval=10,
+                 padding=0.5, size_range=(0.7, 1.4), max_misses=2, smoothing=0.6):
+        self.face_cascade = face_cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.full_scan_interval = full_scan_interval
+        self.padding = padding
+        self.size_range = size_range
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.misses = np.zeros(0, dtype=np.int32)
+        self.frame_index = 0
+        self.force_full_scan = True
+        self.full_scans = 0
+
+    def full_scan(self, gray):
+        self.full_scans += 1
+        faces = self.face_cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+        return np.array(faces, dtype=np.float32).reshape(-1, 4)
+
+    def roi_scan(self, gray, box):
+        x, y, w, h = box
+        pad_w, pad_h = w * self.padding, h * self.padding
+        x0, y0 = int(max(x - pad_w, 0)), int(max(y - pad_h, 0))
+        x1 = int(min(x + w + pad_w, gray.shape[1]))
+        y1 = int(min(y + h + pad_h, gray.shape[0]))
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        # Only look for faces of roughly the size we are tracking
+        min_side = int(min(w, h) * self.size_range[0])
+        max_side = int(max(w, h) * self.size_range[1])
+        faces = self.face_cascade.detectMultiScale(gray[y0:y1, x0:x1], self.scale_factor, self.min_neighbors,
+                                                   minSize=(min_side, min_side), maxSize=(max_side, max_side))
+        if len(faces) == 0:
+            return None
+        faces = np.array(faces, dtype=np.float32).reshape(-1, 4)
+        faces[:, 0] += x0
+        faces[:, 1] += y0
+        # Keep the candidate closest to where the face was
+        return faces[np.argmax(box_iou(box, faces))]
+
+    def smooth(self, old, new):
+        return self.smoothing * new + (1 - self.smoothing) * old
+
+    def detect(self, gray):
+        self.frame_index += 1
+        if self.force_full_scan or len(self.boxes) == 0 or self.frame_index % self.full_scan_interval == 0:
+            self.force_full_scan = False
+            faces = self.full_scan(gray)
+            boxes = faces.copy()
+            # Carry smoothing over for faces that match an existing track
+            for i, face in enumerate(faces):
+                if len(self.boxes):
+                    ious = box_iou(face, self.boxes)
+                    best = np.argmax(ious)
+                    if ious[best] > 0.3:
+                        boxes[i] = self.smooth(self.boxes[best], face)
+            self.boxes = boxes
+            self.misses = np.zeros(len(boxes), dtype=np.int32)
+            return self.boxes.astype(np.int32)
+
+        keep = np.ones(len(self.boxes), dtype=bool)
+        for i, box in enumerate(self.boxes):
+            face = self.roi_scan(gray, box)
+            if face is None:
+                self.misses[i] += 1
+                if self.misses[i] > self.max_misses:
+                    keep[i] = False
+                    self.force_full_scan = True
+            else:
+                self.boxes[i] = self.smooth(box, face)
+                self.misses[i] = 0
+        self.boxes = self.boxes[keep]
+        self.misses = self.misses[keep]
+        return self.boxes.astype(np.int32)
+
+class HaarFaceDetector:
+    # Haar cascade on a fixed-width grayscale copy of the frame
+    def __init__(self, input_width=320, scale_factor=1.2, min_neighbors=4):
+        self.face_cascade = load_face_cascade()
+        self.input_width = input_width
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, img):
+        scale = self.input_width / img.shape[1]
+        small = cv2.resize(img, (self.input_width, int(round(img.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        faces = self.face_cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+        boxes = (np.array(faces, dtype=np.float32).reshape(-1, 4) / scale).astype(np.int32)
+        return boxes, np.ones(len(boxes), dtype=np.float32)
+
+class YuNetFaceDetector:
+    # cv2.FaceDetectorYN with the YuNet ONNX model at a fixed input size
+    def __init__(self, model="face_detection_yunet_2023mar.onnx", input_size=(320, 240), score_threshold=0.6):
+        self.input_size = input_size
+
+        def load():
+            return cv2.FaceDetectorYN.create(resolve_path(model), "", input_size, score_threshold)
+        self.detector = registry.get(("yunet", model, input_size, score_threshold), load)
+
+    def detect(self, img):
+        small = cv2.resize(img, self.input_size, interpolation=cv2.INTER_AREA)
+        _, faces = self.detector.detect(small)
+        if faces is None:
+            return np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.float32)
+        x_scale = img.shape[1] / self.input_size[0]
+        y_scale = img.shape[0] / self.input_size[1]
+        boxes = faces[:, :4] * np.array([x_scale, y_scale, x_scale, y_scale], dtype=np.float32)
+        return boxes.astype(np.int32), faces[:, 14].astype(np.float32)
+
+class Res10FaceDetector:
+    # ResNet-10 SSD face detector through cv2.dnn; blobFromImage resizes to the fixed input
+    def __init__(self, config="deploy.prototxt", weights="res10_300x300_ssd_iter_140000.caffemodel",
+                 input_size=(300, 300), score_threshold=0.5):
+        self.net = get_dnn(weights, config)
+        self.input_size = input_size
+        self.score_threshold = score_threshold
+
+    def detect(self, img):
+        height, width = img.shape[:2]
+        blob = cv2.dnn.blobFromImage(img, 1.0, self.input_size, (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        boxes, scores, _ = decode_ssd_outputs([self.net.forward()], width, height, self.score_threshold)
+        return boxes, scores
+
+FACE_DETECTORS = {
+    "haar": HaarFaceDetector,
+    "yunet": YuNetFaceDetector,
+    "res10": Res10FaceDetector,
+}
+
+def create_face_detector(name="haar", **kwargs):
+    return FACE_DETECTORS[name](**kwargs)
+
+def benchmark_face_detectors(clip, names=None, max_frames=300):
+    # Every backend sees exactly the same frames
+    cap = cv2.VideoCapture(clip)
+    frames = []
+    while len(frames) < max_frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        frames.append(img)
+    cap.release()
+    if not frames:
+        print(f"No frames read from {clip}")
+        return
+
+    print(f"{'backend':<10}{'mean ms':>10}{'p95 ms':>10}{'hit rate':>10}{'faces/frame':>13}")
+    for name in names or list(FACE_DETECTORS):
+        try:
+            detector = create_face_detector(name)
+        except (cv2.error, OSError, RuntimeError) as e:
+            print(f"{name:<10}skipped: {e}")
+            continue
+        latencies = []
+        hits = faces = 0
+        for img in frames:
+            start = time.perf_counter()
+            boxes, _ = detector.detect(img)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += int(len(boxes) > 0)
+            faces += len(boxes)
+        print(f"{name:<10}{np.mean(latencies):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+              f"{hits / len(frames):>10.3f}{faces / len(frames):>13.2f}")
+
+def evaluate_face_service(clip, max_frames=500, iou_threshold=0.3, **kwargs):
+    # Frame time and recall of the service, using full-frame detection as ground truth
+    face_cascade = load_face_cascade()
+    service = FaceDetectionService(face_cascade, **kwargs)
+    cap = cv2.VideoCapture(clip)
+    full_time = service_time = 0.0
+    reference_faces = matched_faces = frames = 0
+
+    while frames < max_frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        start = time.perf_counter()
+        reference = face_cascade.detectMultiScale(gray, service.scale_factor, service.min_neighbors)
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        boxes = service.detect(gray)
+        service_time += time.perf_counter() - start
+
+        reference_faces += len(reference)
+        if len(boxes):
+            for face in reference:
+                if box_iou(face, boxes.astype(np.float32)).max() >= iou_threshold:
+                    matched_faces += 1
+        frames += 1
+
+    cap.release()
+    if frames == 0:
+        print(f"No frames read from {clip}")
+        return
+    recall = matched_faces / reference_faces if reference_faces else 1.0
+    print(f"{frames} frames: full-frame {full_time / frames * 1000:.2f} ms/frame, "
+          f"service {service_time / frames * 1000:.2f} ms/frame "
+          f"({service.full_scans} full scans), recall {recall:.3f}")
+
+def face_detection(backend="haar"):
+    if backend == "haar":
+        # Haar gets ROI tracking between full scans
+        service = FaceDetectionService(load_face_cascade())
+    else:
+        detector = create_face_detector(backend)
+    webcam = cv2.VideoCapture(0)
+
+    while True:
+        _, img = webcam.read()
+        if backend == "haar":
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            faces = service.detect(gray)
+        else:
+            faces, _ = detector.detect(img)
+        
+        for (x, y, w, h) in faces:
+            cv2.rectangle(img, (x, y), (x+w, y+h), (0, 255, 0), 3)
+        
+        cv2.imshow("Face detection", img)
+        
+        key = cv2.waitKey(10)
+
+        if key == 27:  # ESC key to break
+            break
+
+    webcam.release()
+    cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face detection")
+    parser.add_argument("--evaluate", metavar="CLIP",
+                        help="report frame time and recall of ROI tracking vs full-frame detection")
+    parser.add_argument("--backend", default="haar", choices=list(FACE_DETECTORS), help="face detector backend")
+    parser.add_argument("--benchmark", metavar="CLIP",
+                        help="compare latency and hit rate of all backends on the same frames")
+    args = parser.parse_args()
+
+    if args.evaluate:
+        evaluate_face_service(args.evaluate)
+    elif args.benchmark:
+        benchmark_face_detectors(args.benchmark)
+    else:
+        face_detection(args.backend)
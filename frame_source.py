@@ -0,0 +1,326 @@
+# frame_source.py
+# Shared frame sources: cameras, video files and image folders read into a preallocated
+# ring of buffers, plus a shared-memory transport so several processes can read one camera.
+import argparse
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+class FrameRing:
+    # N preallocated frames reused round-robin. A view stays valid until the ring
+    # wraps around, so consumers must be done with it within `slots - 1` reads.
+    def __init__(self, shape, slots=4, dtype=np.uint8):
+        self.buffers = np.zeros((slots,) + tuple(shape), dtype=dtype)
+        self.slots = slots
+        self.index = 0
+
+    def next_buffer(self):
+        buffer = self.buffers[self.index]
+        self.index = (self.index + 1) % self.slots
+        return buffer
+
+def read_only(buffer):
+    view = buffer.view()
+    view.flags.writeable = False
+    return view
+
+class FrameSource:
+    # Subclasses implement grab(out) which fills `out` in place and returns True on success
+    def __init__(self, slots=4, mirror=False, writable=False):
+        self.slots = slots
+        self.mirror = mirror
+        self.writable = writable
+        self.ring = None
+        self.scratch = None
+        self.frames_read = 0
+
+    def read(self):
+        if self.ring is None:
+            first = self.first_frame()
+            if first is None:
+                return False, None
+            self.ring = FrameRing(first.shape, self.slots, first.dtype)
+            buffer = self.ring.next_buffer()
+            if self.mirror:
+                cv2.flip(first, 1, dst=buffer)
+            else:
+                np.copyto(buffer, first)
+        else:
+            buffer = self.ring.next_buffer()
+            if self.mirror:
+                # Read into scratch and flip straight into the ring slot
+                if self.scratch is None:
+                    self.scratch = np.empty_like(buffer)
+                if not self.grab(self.scratch):
+                    return False, None
+                cv2.flip(self.scratch, 1, dst=buffer)
+            elif not self.grab(buffer):
+                return False, None
+
+        self.frames_read += 1
+        return True, buffer if self.writable else read_only(buffer)
+
+    def __iter__(self):
+        while True:
+            ok, frame = self.read()
+            if not ok:
+                return
+            yield frame
+
+    def release(self):
+        pass
+
+class CaptureSource(FrameSource):
+    # Cameras and video files through cv2.VideoCapture
+    def __init__(self, source=0, width=None, height=None, fps=None, **kwargs):
+        super().__init__(**kwargs)
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def first_frame(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def grab(self, out):
+        ret, frame = self.cap.read(out)
+        if not ret:
+            return False
+        if frame is not out:
+            # Backend handed back a new array (size change); fall back to a copy
+            if frame.shape == out.shape:
+                np.copyto(out, frame)
+            else:
+                cv2.resize(frame, out.shape[1::-1], dst=out)
+        return True
+
+    def release(self):
+        self.cap.release()
+
+class ImageFolderSource(FrameSource):
+    def __init__(self, folder, loop=False, **kwargs):
+        super().__init__(**kwargs)
+        self.paths = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.loop = loop
+        self.position = 0
+
+    def next_image(self):
+        while self.position < len(self.paths) or (self.loop and self.paths):
+            if self.position >= len(self.paths):
+                self.position = 0
+            image = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if image is not None:
+                return image
+        return None
+
+    def first_frame(self):
+        return self.next_image()
+
+    def grab(self, out):
+        image = self.next_image()
+        if image is None:
+            return False
+        if image.shape == out.shape:
+            np.copyto(out, image)
+        else:
+            cv2.resize(image, out.shape[1::-1], dst=out)
+        return True
+
+# Shared-memory layout: int64 header [height, width, channels, slots, frames written],
+# then one int64 sequence number per slot, then the frame slots themselves. A slot's sequence
+# is -1 while the publisher is writing it (seqlock), so readers can detect torn frames.
+HEADER_FIELDS = 5
+
+class SharedFramePublisher:
+    # Reads a source directly into shared memory slots for other processes to consume
+    def __init__(self, name, shape, slots=4):
+        self.shape = tuple(shape)
+        self.slots = slots
+        header_bytes = (HEADER_FIELDS + slots) * 8
+        frame_bytes = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=header_bytes + slots * frame_bytes)
+        self.header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.header[:] = 0
+        self.header[:4] = (*self.shape, slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+
+    def publish(self, source):
+        # Copy-free for capture sources: VideoCapture decodes straight into the slot
+        written = int(self.header[4])
+        slot = written % self.slots
+        self.header[HEADER_FIELDS + slot] = -1
+        if isinstance(source, CaptureSource):
+            ok = source.grab(self.frames[slot])
+        else:
+            ok, frame = source.read()
+            if ok:
+                np.copyto(self.frames[slot], frame)
+        if ok:
+            self.header[HEADER_FIELDS + slot] = written + 1
+            self.header[4] = written + 1
+        return ok
+
+    def close(self):
+        del self.header, self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+class SharedFrameSource:
+    # Reader side of SharedFramePublisher. By default hands out read-only views of the newest
+    # frame, which stay intact only until the publisher wraps around to that slot again
+    # (slots - 1 publishes later). Slow consumers should check valid() after using a view, or
+    # open with writable=True to get a private copy that is verified against the slot sequence.
+    def __init__(self, name, poll_interval=0.002, writable=False):
+        self.shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        height, width, channels, slots = (int(v) for v in header[:4])
+        self.shape = (height, width, channels)
+        self.slots = slots
+        header_bytes = (HEADER_FIELDS + slots) * 8
+        self.header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        self.poll_interval = poll_interval
+        self.writable = writable
+        self.ring = FrameRing(self.shape, 2) if writable else None
+        self.last_seen = 0
+        self.current_slot = None
+        self.frames_read = 0
+        self.torn_reads = 0
+
+    def slot_sequence(self, slot):
+        return int(self.header[HEADER_FIELDS + slot])
+
+    def valid(self):
+        # True while the last view handed out has not been overwritten by the publisher
+        return self.current_slot is None or self.slot_sequence(self.current_slot) == self.last_seen
+
+    def read(self, timeout=1.0):
+        if not self.valid():
+            # The previous view was overwritten while the consumer was still using it
+            self.torn_reads += 1
+        deadline = time.perf_counter() + timeout
+        while True:
+            written = int(self.header[4])
+            slot = (written - 1) % self.slots
+            # Wait for a new frame whose slot is not already being rewritten
+            if written != self.last_seen and self.slot_sequence(slot) == written:
+                if not self.writable:
+                    break
+                buffer = self.ring.next_buffer()
+                np.copyto(buffer, self.frames[slot])
+                if self.slot_sequence(slot) == written:
+                    break
+                self.torn_reads += 1
+            if time.perf_counter() > deadline:
+                return False, None
+            time.sleep(self.poll_interval)
+
+        self.last_seen = written
+        self.frames_read += 1
+        if self.writable:
+            self.current_slot = None
+            return True, buffer
+        self.current_slot = slot
+        return True, read_only(self.frames[slot])
+
+    def __iter__(self):
+        while True:
+            ok, frame = self.read()
+            if not ok:
+                return
+            yield frame
+
+    def release(self):
+        del self.header, self.frames
+        self.shm.close()
+
+class FrameMailbox:
+    # Single-slot hand-off between threads: the producer overwrites the newest frame and its
+    # stats, consumers take whatever is there at their own rate. Nothing queues up.
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.frame = None
+        self.stats = None
+        self.sequence = 0
+        self.overwritten = 0
+        self.last_taken = 0
+
+    def put(self, frame, stats=None):
+        with self.condition:
+            if self.sequence != self.last_taken:
+                self.overwritten += 1
+            self.frame = frame
+            self.stats = stats
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def get(self, last_sequence=None):
+        # Returns (sequence, frame, stats); frame is None if nothing newer than last_sequence
+        with self.condition:
+            return self.take(last_sequence)
+
+    def wait(self, last_sequence=None, timeout=1.0):
+        # Like get(), but blocks up to `timeout` seconds for a frame newer than last_sequence
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame is not None and self.sequence != last_sequence, timeout)
+            return self.take(last_sequence)
+
+    def take(self, last_sequence):
+        if self.frame is None or self.sequence == last_sequence:
+            return self.sequence, None, self.stats
+        self.last_taken = self.sequence
+        return self.sequence, self.frame, self.stats
+
+def open_source(spec=0, **kwargs):
+    # int or digit string -> camera, "shm:<name>" -> shared memory, directory -> images, else video file
+    if isinstance(spec, str) and spec.startswith("shm:"):
+        unsupported = set(kwargs) - {"writable"}
+        if unsupported:
+            raise TypeError(f"Shared memory sources do not support: {', '.join(sorted(unsupported))}")
+        return SharedFrameSource(spec[4:], **kwargs)
+    if isinstance(spec, str) and spec.isdigit():
+        spec = int(spec)
+    if isinstance(spec, str) and os.path.isdir(spec):
+        return ImageFolderSource(spec, **kwargs)
+    return CaptureSource(spec, **kwargs)
+
+def publish_camera(source=0, name="camera0", slots=4):
+    # Run in its own process: python frame_source.py --publish 0 --name camera0
+    capture = open_source(source)
+    ok, frame = capture.read()
+    if not ok:
+        raise RuntimeError(f"Cannot read from {source}")
+    publisher = SharedFramePublisher(name, frame.shape, slots)
+    print(f"Publishing {source} as shm:{name} ({frame.shape[1]}x{frame.shape[0]}, {slots} slots)")
+    try:
+        while publisher.publish(capture):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.release()
+        publisher.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish a camera into shared memory")
+    parser.add_argument("--publish", default="0", help="camera index, video file or image folder")
+    parser.add_argument("--name", default="camera0", help="shared memory block name")
+    parser.add_argument("--slots", type=int, default=4)
+    args = parser.parse_args()
+
+    publish_camera(args.publish, args.name, args.slots)
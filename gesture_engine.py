@@ -0,0 +1,191 @@
+# gesture_engine.py
+# Pinch gestures for volume control: the thumb-index distance is smoothed and mapped to
+# states with hysteresis bands, and the resulting key actions go through a worker thread
+# that rate-limits and coalesces them before they reach a pluggable output backend.
+import argparse
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from event_dispatch import RateLimiter
+
+class PinchGesture:
+    # States: "close" (fingers together), "open" (fingers apart) or "neutral".
+    # A state is entered past its band edge and only left once the distance is back past
+    # the edge by `margin`, so noise around a threshold does not toggle it. Holding a state
+    # repeats its action every `repeat_interval` seconds.
+    ACTIONS = {"close": "volumedown", "open": "volumeup"}
+
+    def __init__(self, close_below=40, open_above=100, margin=10, alpha=0.4, repeat_interval=0.3):
+        self.close_below = close_below
+        self.open_above = open_above
+        self.margin = margin
+        self.alpha = alpha
+        self.repeat_interval = repeat_interval
+        self.reset()
+
+    def reset(self):
+        self.distance = None
+        self.state = "neutral"
+        self.last_action = None
+
+    def update(self, distance, now=None):
+        # Returns the action to send for this frame, or None. distance=None means no hand.
+        now = time.monotonic() if now is None else now
+        if distance is None:
+            self.reset()
+            return None
+        self.distance = distance if self.distance is None else self.distance + self.alpha * (distance - self.distance)
+
+        previous = self.state
+        if self.state == "close" and self.distance > self.close_below + self.margin:
+            self.state = "neutral"
+        elif self.state == "open" and self.distance < self.open_above - self.margin:
+            self.state = "neutral"
+        if self.state == "neutral":
+            if self.distance < self.close_below:
+                self.state = "close"
+            elif self.distance > self.open_above:
+                self.state = "open"
+
+        if self.state == "neutral":
+            return None
+        if self.state != previous or now - self.last_action >= self.repeat_interval:
+            self.last_action = now
+            return self.ACTIONS[self.state]
+        return None
+
+class PyAutoGuiBackend:
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def send(self, action):
+        self.pyautogui.press(action)
+
+class NullBackend:
+    def send(self, action):
+        pass
+
+class RecordingBackend:
+    # Keeps (timestamp, action) for tests and measurements
+    def __init__(self):
+        self.actions = []
+
+    def send(self, action):
+        self.actions.append((time.monotonic(), action))
+
+BACKENDS = {"pyautogui": PyAutoGuiBackend, "null": NullBackend, "record": RecordingBackend}
+
+class ActionDispatcher:
+    # publish() never blocks: repeated requests for an action that has not been sent yet
+    # coalesce into one, and sends are limited to `rate` per second on the worker thread.
+    def __init__(self, backend, rate=5.0, burst=2):
+        self.backend = backend
+        self.limiter = RateLimiter(rate, burst)
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        self.published = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.send_seconds = 0.0
+        self.running = True
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def publish(self, action):
+        with self.condition:
+            self.published += 1
+            if action in self.pending:
+                self.coalesced += 1
+            else:
+                self.pending[action] = time.monotonic()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running, timeout=0.5)
+                if not self.running:
+                    return
+                if not self.pending:
+                    continue
+                if not self.limiter.allow():
+                    # Wait for the next token outside the lock; more requests can coalesce meanwhile
+                    wait = (1 - self.limiter.tokens) / self.limiter.rate
+                    action = None
+                else:
+                    action, _ = self.pending.popitem(last=False)
+            if action is None:
+                time.sleep(wait)
+                continue
+            start = time.perf_counter()
+            try:
+                self.backend.send(action)
+            except Exception as e:
+                print(f"Gesture action {action} failed: {e}")
+            self.send_seconds += time.perf_counter() - start
+            self.sent += 1
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.worker.join(timeout=1.0)
+
+class LoopTimer:
+    # Per-frame latency of the capture loop over the last `window` frames
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.start = None
+
+    def mark(self):
+        self.start = time.perf_counter()
+
+    def lap(self):
+        self.samples.append(time.perf_counter() - self.start)
+
+    def summary(self):
+        if not self.samples:
+            return 0.0, 0.0
+        samples = np.array(self.samples) * 1000
+        return float(samples.mean()), float(np.percentile(samples, 95))
+
+def synthetic_distances(count, fps=30, noise=6.0):
+    # Pinch closed, neutral and spread phases of two seconds each, with landmark jitter
+    rng = np.random.default_rng(0)
+    phase = (np.arange(count) // (2 * fps)) % 3
+    return np.choose(phase, [30.0, 70.0, 115.0]) + rng.normal(0, noise, count)
+
+def benchmark_gestures(seconds=12, fps=30):
+    # Compares key events per second: per-frame thresholds vs. the gesture engine + dispatcher.
+    # Runs in real time so the dispatcher's rate limiting applies as it would live.
+    distances = synthetic_distances(seconds * fps, fps)
+    legacy = int(np.sum((distances < 40) | (distances > 100)))
+
+    gesture = PinchGesture()
+    backend = RecordingBackend()
+    dispatcher = ActionDispatcher(backend)
+    timer = LoopTimer(window=len(distances))
+    start = time.monotonic()
+    for i, distance in enumerate(distances):
+        time.sleep(max(0.0, start + i / fps - time.monotonic()))
+        timer.mark()
+        action = gesture.update(float(distance))
+        if action:
+            dispatcher.publish(action)
+        timer.lap()
+    time.sleep(0.5)
+    dispatcher.stop()
+    mean_ms, p95_ms = timer.summary()
+    print(f"{seconds} s at {fps} fps: per-frame thresholds send {legacy} keys ({legacy / seconds:.1f}/s)")
+    print(f"gesture engine: {dispatcher.published} actions published, {dispatcher.coalesced} coalesced, "
+          f"{len(backend.actions)} sent ({len(backend.actions) / seconds:.1f}/s)")
+    print(f"loop cost per frame: mean {mean_ms * 1000:.1f} us, p95 {p95_ms * 1000:.1f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gesture engine benchmark on a synthetic pinch stream")
+    parser.add_argument("--seconds", type=int, default=12)
+    args = parser.parse_args()
+
+    benchmark_gestures(args.seconds)
@@ -1,56 +1,82 @@
+import argparse
+import time
 import cv2
 import mediapipe as mp
-import pyautogui
-import math
-
-x1 = y1 = x2 = y2 = 0
-webcam = cv2.VideoCapture(0)
-
-my_hands = mp.solutions.hands.Hands()
-drawing_utils = mp.solutions.drawing_utils
-
-while True:
-    _, image = webcam.read()
-    image = cv2.flip(image, 1)
-    frame_height, frame_width, _ = image.shape
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    output = my_hands.process(rgb_image)
-    hands = output.multi_hand_landmarks
-
-    if hands:
-        for hand in hands:
-            drawing_utils.draw_landmarks(image, hand)
-            landmarks = hand.landmark
-
-            for id, landmark in enumerate(landmarks):
-                x = int(landmark.x * frame_width)
-                y = int(landmark.y * frame_height)
-
-                if id == 8:  # Index fingertip
-                    cv2.circle(img=image, center=(x, y), radius=8, color=(0, 255, 255), thickness=3)
-                    x1, y1 = x, y
-
-                if id == 4:  # Thumb tip
-                    cv2.circle(img=image, center=(x, y), radius=8, color=(0, 0, 255), thickness=3)
-                    x2, y2 = x, y
-
-            # After detecting both points → measure distance
-            if x1 and x2:
-                distance = math.hypot(x2 - x1, y2 - y1)
-                cv2.putText(image, f"Dist: {int(distance)}", (50, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
-
-                # Volume control based on distance
-                if distance < 40:   # fingers close → decrease volume
-                    pyautogui.press("volumedown")
-                elif distance > 100:  # fingers far apart → increase volume
-                    pyautogui.press("volumeup")
-
-    cv2.imshow("Hand Tracking with Volume Control", image)
-
-    key = cv2.waitKey(10)
-    if key == 27:  # ESC key
-        break
-
-webcam.release()
-cv2.destroyAllWindows()
+from gesture_engine import BACKENDS, ActionDispatcher, LoopTimer, PinchGesture, benchmark_gestures
+from landmarks import THUMB_INDEX, landmarks_array, pair_distance, pixel_points
+from model_registry import get_mediapipe
+
+def hand_gesture(backend="pyautogui", rate=5.0):
+    webcam = cv2.VideoCapture(0)
+
+    my_hands = get_mediapipe("hands")
+    drawing_utils = mp.solutions.drawing_utils
+
+    # Smoothed pinch distance with hysteresis; key presses are sent from a worker thread
+    gesture = PinchGesture(close_below=40, open_above=100)
+    dispatcher = ActionDispatcher(BACKENDS[backend](), rate=rate)
+    timer = LoopTimer()
+    start = time.monotonic()
+
+    while True:
+        _, image = webcam.read()
+        timer.mark()
+        image = cv2.flip(image, 1)
+        frame_height, frame_width, _ = image.shape
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        output = my_hands.process(rgb_image)
+        hands = output.multi_hand_landmarks
+
+        distance = None
+        if hands:
+            # Thumb and index fingertips of every hand, read by landmark id
+            tips = landmarks_array(hands, THUMB_INDEX, (frame_width, frame_height))
+            distances = pair_distance(tips)
+
+            for hand, (thumb, index) in zip(hands, pixel_points(tips)):
+                drawing_utils.draw_landmarks(image, hand)
+                cv2.circle(img=image, center=tuple(map(int, index)), radius=8, color=(0, 255, 255), thickness=3)
+                cv2.circle(img=image, center=tuple(map(int, thumb)), radius=8, color=(0, 0, 255), thickness=3)
+
+            # The first hand controls the volume
+            distance = float(distances[0])
+
+        # Volume control based on the smoothed distance: close → decrease, apart → increase
+        action = gesture.update(distance)
+        if action:
+            dispatcher.publish(action)
+
+        if gesture.distance is not None:
+            cv2.putText(image, f"Dist: {int(gesture.distance)} ({gesture.state})", (50, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+        timer.lap()
+        mean_ms, p95_ms = timer.summary()
+        cv2.putText(image, f"Loop {mean_ms:.1f} ms (p95 {p95_ms:.1f}), keys sent {dispatcher.sent}",
+                    (10, frame_height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+        cv2.imshow("Hand Tracking with Volume Control", image)
+
+        key = cv2.waitKey(10)
+        if key == 27:  # ESC key
+            break
+
+    dispatcher.stop()
+    elapsed = time.monotonic() - start
+    print(f"{dispatcher.published} actions published, {dispatcher.coalesced} coalesced, "
+          f"{dispatcher.sent} sent ({dispatcher.sent / elapsed:.2f}/s); loop mean {timer.summary()[0]:.1f} ms")
+    webcam.release()
+    cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hand gesture volume control")
+    parser.add_argument("--backend", default="pyautogui", choices=list(BACKENDS),
+                        help="where key actions go; 'null' and 'record' send nothing to the OS")
+    parser.add_argument("--rate", type=float, default=5.0, help="maximum key presses per second")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare key event rates on a synthetic pinch stream, no camera needed")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_gestures()
+    else:
+        hand_gesture(args.backend, args.rate)
@@ -0,0 +1,41 @@
+# landmarks.py
+# MediaPipe results as NumPy arrays: one (N, 3) row block per face or hand, picked by
+# landmark id instead of scanning every landmark, with geometric features for all at once.
+import numpy as np
+
+# Face Mesh ids (the same in the 468- and refined 478-point meshes)
+MOUTH_CORNERS = (61, 291)
+OUTER_EYE_CORNERS = (33, 263)
+FACE_SIDES = (234, 454)  # left and right face contour at cheek level
+
+# Hands ids
+WRIST = 0
+THUMB_TIP = 4
+INDEX_TIP = 8
+FINGERTIPS = (4, 8, 12, 16, 20)
+THUMB_INDEX = (THUMB_TIP, INDEX_TIP)
+
+def landmarks_array(landmark_lists, indices=None, size=None):
+    # multi_face_landmarks / multi_hand_landmarks -> float32 (people, len(indices), 3).
+    # Only the requested ids are read from each result. With size=(w, h), x and y are in
+    # pixels; z is scaled by the width, the same scale MediaPipe uses for depth.
+    count = 0 if indices is None else len(indices)
+    if not landmark_lists:
+        return np.empty((0, count, 3), np.float32)
+    rows = []
+    for landmark_list in landmark_lists:
+        landmark = landmark_list.landmark
+        picked = landmark if indices is None else (landmark[i] for i in indices)
+        rows.append([(point.x, point.y, point.z) for point in picked])
+    points = np.asarray(rows, np.float32)
+    if size is not None:
+        points *= np.array([size[0], size[1], size[0]], np.float32)
+    return points
+
+def pair_distance(points, a=0, b=1):
+    # Image-plane distance between columns a and b of a (people, N, 3) array, per person
+    return np.linalg.norm(points[:, b, :2] - points[:, a, :2], axis=-1)
+
+def pixel_points(points):
+    # (people, N, 3) -> int (people, N, 2) for drawing
+    return np.rint(points[..., :2]).astype(np.int32)
@@ -0,0 +1,109 @@
+# model_registry.py
+# Process-wide, lazily loaded models shared by all the tools. Paths are resolved in one
+# place and every load is timed so cold start on the Pi can be measured.
+import argparse
+import os
+import threading
+import time
+import cv2
+
+MODEL_DIR_ENV = "ADAS_MODEL_DIR"
+
+def model_dirs():
+    dirs = []
+    if os.environ.get(MODEL_DIR_ENV):
+        dirs.append(os.environ[MODEL_DIR_ENV])
+    dirs.append(os.getcwd())
+    dirs.append(os.path.dirname(os.path.abspath(__file__)))
+    if hasattr(cv2, "data"):
+        dirs.append(cv2.data.haarcascades)
+    return dirs
+
+def resolve_path(filename):
+    if not filename or os.path.isabs(filename):
+        return filename
+    searched = model_dirs()
+    for directory in searched:
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"'{filename}' not found in: {', '.join(searched)}")
+
+class ModelRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models = {}
+        self.load_times = {}
+
+    def get(self, key, loader):
+        with self.lock:
+            if key not in self.models:
+                start = time.perf_counter()
+                self.models[key] = loader()
+                self.load_times[key] = (time.perf_counter() - start) * 1000
+            return self.models[key]
+
+    def report(self):
+        for key, ms in self.load_times.items():
+            print(f"  {key_name(key):<60}{ms:>10.1f} ms")
+        print(f"  {'total':<60}{sum(self.load_times.values()):>10.1f} ms")
+
+def key_name(key):
+    return " ".join(str(part) for part in key if part)
+
+registry = ModelRegistry()
+
+def get_cascade(filename="haarcascade_frontalface_default.xml"):
+    def load():
+        path = resolve_path(filename)
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise RuntimeError(f"Failed to load cascade {path}")
+        return cascade
+    return registry.get(("cascade", filename), load)
+
+def get_dnn(weights, config="", backend=None, target=None):
+    # Nets are keyed by backend/target too, since those are set on the net itself
+    def load():
+        net = cv2.dnn.readNet(resolve_path(weights), resolve_path(config))
+        if backend is not None:
+            net.setPreferableBackend(backend)
+        if target is not None:
+            net.setPreferableTarget(target)
+        return net
+    return registry.get(("dnn", weights, config, backend, target), load)
+
+def get_text_lines(filename):
+    def load():
+        with open(resolve_path(filename), "r") as f:
+            return [line.strip() for line in f.readlines()]
+    return registry.get(("text", filename), load)
+
+def get_mediapipe(solution, **options):
+    # e.g. get_mediapipe("face_mesh", refine_landmarks=True) -> mp.solutions.face_mesh.FaceMesh(...)
+    classes = {"face_mesh": "FaceMesh", "hands": "Hands", "face_detection": "FaceDetection", "pose": "Pose"}
+
+    def load():
+        import mediapipe as mp
+        module = getattr(mp.solutions, solution)
+        return getattr(module, classes[solution])(**options)
+    return registry.get(("mediapipe", solution, tuple(sorted(options.items()))), load)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load models and report cold-start load times")
+    parser.add_argument("--cascade", action="store_true", help="load the Haar face cascade")
+    parser.add_argument("--yolo", nargs="*", metavar="MODEL", help="load objectdetector models (default yolov3)")
+    parser.add_argument("--mediapipe", action="store_true", help="load the MediaPipe face mesh and hands")
+    args = parser.parse_args()
+
+    print("Model search path: " + ", ".join(model_dirs()))
+    if args.cascade:
+        get_cascade()
+    if args.yolo is not None:
+        from objectdetector import load_model
+        for name in args.yolo or ["yolov3"]:
+            load_model(name)
+    if args.mediapipe:
+        get_mediapipe("face_mesh", refine_landmarks=True)
+        get_mediapipe("hands")
+    registry.report()
@@ -0,0 +1,133 @@
+# motion_engine.py
+# Single-read motion detection: every frame is converted once and compared against the
+# previous frame, a running average or a MOG2 background, using preallocated buffers.
+import argparse
+import time
+import cv2
+import numpy as np
+
+class MotionEngine:
+    MODES = ("diff", "average", "mog2")
+
+    def __init__(self, mode="diff", sensitivity=5000, scale=1.0, threshold=30, average_rate=0.05):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown motion mode '{mode}', choose from: {', '.join(self.MODES)}")
+        self.mode = mode
+        self.sensitivity = sensitivity  # minimum contour area in full-resolution pixels
+        self.scale = scale
+        self.threshold = threshold
+        self.average_rate = average_rate
+        self.shape = None
+        self.subtractor = None
+        self.frames = 0
+
+    def allocate(self, frame_shape):
+        height, width = frame_shape[:2]
+        small = (max(1, int(round(height * self.scale))), max(1, int(round(width * self.scale))))
+        self.shape = (frame_shape, self.scale)
+        self.gray = np.empty((height, width), np.uint8)
+        self.small = np.empty(small, np.uint8) if self.scale != 1.0 else self.gray
+        self.diff = np.empty(small, np.uint8)
+        self.thresh = np.empty(small, np.uint8)
+        self.dilated = np.empty(small, np.uint8)
+        # Reference state only for the selected mode
+        if self.mode == "diff":
+            self.previous = np.empty(small, np.uint8)
+        elif self.mode == "average":
+            self.background = np.empty(small, np.float32)
+            self.background_u8 = np.empty(small, np.uint8)
+        elif self.subtractor is None:
+            # MOG2 re-initialises its model by itself when the frame size changes
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
+        # Keep the dilation footprint roughly constant in full-resolution pixels
+        size = max(1, int(round(5 * self.scale))) | 1
+        self.kernel = np.ones((size, size), np.uint8)
+        self.frames = 0
+
+    def set_scale(self, scale):
+        # Buffers are reallocated on the next frame
+        self.scale = scale
+
+    def foreground(self):
+        if self.mode == "diff":
+            cv2.absdiff(self.small, self.previous, dst=self.diff)
+            # Keep this frame for the next diff without copying: swap the buffers
+            if self.small is self.gray:
+                self.gray, self.previous = self.previous, self.gray
+                self.small = self.gray
+            else:
+                self.small, self.previous = self.previous, self.small
+        elif self.mode == "average":
+            cv2.convertScaleAbs(self.background, dst=self.background_u8)
+            cv2.absdiff(self.small, self.background_u8, dst=self.diff)
+            cv2.accumulateWeighted(self.small, self.background, self.average_rate)
+        else:
+            # MOG2 marks shadows as 127; the threshold below drops them
+            self.diff = self.subtractor.apply(self.small, self.diff)
+        return self.diff
+
+    def process(self, frame):
+        # Returns motion boxes (x, y, w, h) in full-resolution coordinates
+        if self.shape != (frame.shape, self.scale):
+            self.allocate(frame.shape)
+
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        if self.small is not self.gray:
+            cv2.resize(self.gray, self.small.shape[::-1], dst=self.small, interpolation=cv2.INTER_AREA)
+
+        self.frames += 1
+        if self.frames == 1:
+            # Prime the reference with the first frame
+            if self.mode == "diff":
+                np.copyto(self.previous, self.small)
+            elif self.mode == "average":
+                self.background[:] = self.small
+            else:
+                self.subtractor.apply(self.small)
+            return []
+
+        diff = self.foreground()
+        threshold = 200 if self.mode == "mog2" else self.threshold
+        cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY, dst=self.thresh)
+        cv2.dilate(self.thresh, self.kernel, dst=self.dilated, iterations=2)
+        contours, _ = cv2.findContours(self.dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # Sensitivity is a full-resolution area, so it shrinks with the square of the scale
+        min_area = self.sensitivity * self.scale * self.scale
+        boxes = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            boxes.append((int(x / self.scale), int(y / self.scale), int(w / self.scale), int(h / self.scale)))
+        return boxes
+
+def synthetic_motion_frames(count=200, width=1280, height=720):
+    # Noisy background with a block sliding across it
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+    for i in range(count):
+        frame = background.copy()
+        x = (i * 30) % (width - 200)
+        cv2.rectangle(frame, (x, 200), (x + 150, 450), (220, 220, 220), -1)
+        yield frame
+
+def benchmark_motion_scales(scales=(1.0, 0.5, 0.25), modes=MotionEngine.MODES, frames=200):
+    clip = list(synthetic_motion_frames(frames))
+    for mode in modes:
+        for scale in scales:
+            engine = MotionEngine(mode, scale=scale)
+            detections = 0
+            start = time.perf_counter()
+            for frame in clip:
+                detections += len(engine.process(frame))
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<8} scale {scale:.2f}x: {elapsed / frames * 1000:.2f} ms/frame, "
+                  f"{detections} motion boxes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Motion engine benchmark")
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    benchmark_motion_scales(frames=args.frames)
@@ -1,72 +1,750 @@
 # yolo_object_detection.py
+import argparse
+import queue
+import threading
+import time
 import cv2
 import numpy as np
+from model_registry import get_dnn, get_text_lines
 
-def yolo_object_detection():
-    # Load YOLO
-    net = cv2.dnn.readNet("yolov3.weights", "yolov3.cfg")
-    classes = []
-    with open("coco.names", "r") as f:
-        classes = [line.strip() for line in f.readlines()]
-    
-    layer_names = net.getLayerNames()
-    output_layers = [layer_names[i[0] - 1] for i in net.getUnconnectedOutLayers()]
-    colors = np.random.uniform(0, 255, size=(len(classes), 3))
+def decode_yolo_outputs(outs, width, height, conf_threshold=0.5):
+    # Stack every output layer into one (N, 5 + num_classes) array
+    detections = np.concatenate([out.reshape(-1, out.shape[-1]) for out in outs], axis=0)
+    scores = detections[:, 5:]
+
+    # Best class and its score per candidate row
+    class_ids = np.argmax(scores, axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+
+    keep = confidences > conf_threshold
+    detections = detections[keep]
+    confidences = confidences[keep].astype(np.float32)
+    class_ids = class_ids[keep].astype(np.int32)
+
+    # Centre/size (relative) -> top-left/size (pixels)
+    w = detections[:, 2] * width
+    h = detections[:, 3] * height
+    x = detections[:, 0] * width - w / 2
+    y = detections[:, 1] * height - h / 2
+    boxes = np.stack([x, y, w, h], axis=1).astype(np.int32)
+
+    return boxes, confidences, class_ids
+
+def decode_yolov5_outputs(outs, width, height, input_size, conf_threshold=0.5):
+    # YOLOv5 ONNX exports: (1, N, 5 + num_classes) rows of (cx, cy, w, h, objectness, class scores...)
+    # in input pixels. YOLOv8 exports are (1, 4 + num_classes, N) with no objectness column and
+    # do not decode with this function.
+    detections = outs[0].reshape(-1, outs[0].shape[-1])
+    scores = detections[:, 5:] * detections[:, 4:5]
+
+    class_ids = np.argmax(scores, axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+
+    keep = confidences > conf_threshold
+    detections = detections[keep]
+    confidences = confidences[keep].astype(np.float32)
+    class_ids = class_ids[keep].astype(np.int32)
+
+    x_scale = width / input_size[0]
+    y_scale = height / input_size[1]
+    w = detections[:, 2] * x_scale
+    h = detections[:, 3] * y_scale
+    x = detections[:, 0] * x_scale - w / 2
+    y = detections[:, 1] * y_scale - h / 2
+    boxes = np.stack([x, y, w, h], axis=1).astype(np.int32)
+
+    return boxes, confidences, class_ids
+
+# COCO category ids (1-90, with gaps) of the 80 classes in coco.names, in file order
+COCO_CATEGORY_IDS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25,
+                     27, 28, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 46, 47, 48, 49, 50, 51,
+                     52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 67, 70, 72, 73, 74, 75, 76, 77,
+                     78, 79, 80, 81, 82, 84, 85, 86, 87, 88, 89, 90)
+
+def category_lookup(category_ids):
+    # category id -> line in the class file, -1 for ids without a class
+    lookup = np.full(max(category_ids) + 1, -1, dtype=np.int32)
+    lookup[list(category_ids)] = np.arange(len(category_ids), dtype=np.int32)
+    return lookup
+
+def decode_ssd_outputs(outs, width, height, conf_threshold=0.5, label_offset=1, label_lookup=None):
+    # SSD DetectionOutput rows: (image_id, label, confidence, x1, y1, x2, y2), coordinates relative.
+    # Labels are either contiguous from label_offset or category ids mapped through label_lookup.
+    detections = outs[0].reshape(-1, 7)
+    detections = detections[detections[:, 2] > conf_threshold]
+    if label_lookup is not None:
+        labels = detections[:, 1].astype(np.int32)
+        in_range = (labels >= 0) & (labels < len(label_lookup))
+        class_ids = np.where(in_range, label_lookup[np.clip(labels, 0, len(label_lookup) - 1)], -1)
+        detections = detections[class_ids >= 0]
+        class_ids = class_ids[class_ids >= 0]
+    else:
+        class_ids = (detections[:, 1] - label_offset).astype(np.int32)
+
+    x1 = detections[:, 3] * width
+    y1 = detections[:, 4] * height
+    x2 = detections[:, 5] * width
+    y2 = detections[:, 6] * height
+    boxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).astype(np.int32)
+
+    return boxes, detections[:, 2].astype(np.float32), class_ids
+
+# Model registry: weights/config paths, network input size and output format
+MODEL_ZOO = {
+    "yolov3": {"weights": "yolov3.weights", "config": "yolov3.cfg", "size": (416, 416),
+               "scale": 1 / 255.0, "mean": (0, 0, 0), "format": "yolo", "classes": "coco.names"},
+    "yolov3-tiny": {"weights": "yolov3-tiny.weights", "config": "yolov3-tiny.cfg", "size": (416, 416),
+                    "scale": 1 / 255.0, "mean": (0, 0, 0), "format": "yolo", "classes": "coco.names"},
+    "yolov4-tiny": {"weights": "yolov4-tiny.weights", "config": "yolov4-tiny.cfg", "size": (416, 416),
+                    "scale": 1 / 255.0, "mean": (0, 0, 0), "format": "yolo", "classes": "coco.names"},
+    "yolov5n-onnx": {"weights": "yolov5n.onnx", "config": "", "size": (640, 640),
+                     "scale": 1 / 255.0, "mean": (0, 0, 0), "format": "yolov5", "classes": "coco.names"},
+    "mobilenet-ssd-onnx": {"weights": "ssd_mobilenet_v2.onnx", "config": "", "size": (300, 300),
+                           "scale": 1 / 127.5, "mean": (127.5, 127.5, 127.5), "format": "ssd",
+                           "classes": "coco.names", "category_ids": COCO_CATEGORY_IDS},
+}
+
+# Backend/target pairs for setPreferableBackend/setPreferableTarget
+DNN_BACKENDS = {
+    "default": (cv2.dnn.DNN_BACKEND_DEFAULT, cv2.dnn.DNN_TARGET_CPU),
+    "opencv": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+    "opencl": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL),
+    "opencl-fp16": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL_FP16),
+    "openvino": (cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU),
+    "openvino-myriad": (cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_MYRIAD),
+}
+
+def available_backends():
+    available = []
+    for name, (backend, target) in DNN_BACKENDS.items():
+        try:
+            targets = cv2.dnn.getAvailableTargets(backend)
+        except cv2.error:
+            continue
+        if backend == cv2.dnn.DNN_BACKEND_DEFAULT or target in targets:
+            available.append(name)
+    return available
+
+class DetectorModel:
+    def __init__(self, name="yolov3", backend="default"):
+        if name not in MODEL_ZOO:
+            raise ValueError(f"Unknown model '{name}', choose from: {', '.join(MODEL_ZOO)}")
+        if backend not in available_backends():
+            raise ValueError(f"Backend '{backend}' is not available, choose from: {', '.join(available_backends())}")
+
+        self.name = name
+        self.spec = MODEL_ZOO[name]
+        # Nets and class lists are loaded once per process and shared
+        preferable_backend, preferable_target = DNN_BACKENDS[backend]
+        self.net = get_dnn(self.spec["weights"], self.spec["config"], preferable_backend, preferable_target)
+        self.classes = get_text_lines(self.spec["classes"])
+        # SSD exports label with dataset category ids rather than class file lines
+        category_ids = self.spec.get("category_ids")
+        self.label_lookup = category_lookup(category_ids) if category_ids else None
+
+        self.output_layers = self.net.getUnconnectedOutLayersNames()
+        self.colors = np.random.uniform(0, 255, size=(len(self.classes), 3))
+
+    def forward(self, images):
+        blob = cv2.dnn.blobFromImages(images, self.spec["scale"], self.spec["size"], self.spec["mean"],
+                                      True, crop=False)
+        self.net.setInput(blob)
+        return self.net.forward(self.output_layers)
+
+    def split_batch(self, outs, batch_size):
+        if self.spec["format"] == "ssd":
+            # SSD stacks every image's detections in one table tagged with image_id
+            detections = outs[0].reshape(-1, 7)
+            return [[detections[detections[:, 0] == b]] for b in range(batch_size)]
+        # Other formats are laid out batch-major
+        outs = [out.reshape(batch_size, -1, out.shape[-1]) for out in outs]
+        return [[out[b] for out in outs] for b in range(batch_size)]
+
+    def decode(self, outs, width, height, conf_threshold=0.5, nms_threshold=0.4):
+        start = time.perf_counter()
+        if self.spec["format"] == "yolo":
+            boxes, confidences, class_ids = decode_yolo_outputs(outs, width, height, conf_threshold)
+        elif self.spec["format"] == "yolov5":
+            boxes, confidences, class_ids = decode_yolov5_outputs(outs, width, height, self.spec["size"],
+                                                                  conf_threshold)
+        else:
+            boxes, confidences, class_ids = decode_ssd_outputs(outs, width, height, conf_threshold,
+                                                               label_lookup=self.label_lookup)
+        decode_ms = (time.perf_counter() - start) * 1000
+
+        indexes = np.array(cv2.dnn.NMSBoxes(boxes, confidences, conf_threshold, nms_threshold), dtype=np.int32).flatten()
+        return boxes[indexes], confidences[indexes], class_ids[indexes], decode_ms
+
+    def detect(self, img, conf_threshold=0.5, nms_threshold=0.4):
+        height, width = img.shape[:2]
+        outs = self.forward([img])
+        return self.decode(outs, width, height, conf_threshold, nms_threshold)
+
+def load_model(name="yolov3", backend="default"):
+    return DetectorModel(name, backend)
+
+def draw_detections(img, boxes, class_ids, classes, colors):
+    font = cv2.FONT_HERSHEY_PLAIN
+    for (x, y, w, h), class_id in zip(boxes, class_ids):
+        label = str(classes[class_id])
+        color = colors[class_id]
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(img, label, (x, y + 30), font, 3, color, 3)
+    return img
+
+class DropOldestQueue:
+    # Bounded queue that evicts the oldest item instead of blocking the producer
+    def __init__(self, maxsize=2):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout=timeout)
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+class StageStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total_ms = {}
+        self.counts = {}
+
+    def add(self, stage, ms):
+        with self.lock:
+            self.total_ms[stage] = self.total_ms.get(stage, 0.0) + ms
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def averages(self):
+        with self.lock:
+            return {stage: self.total_ms[stage] / self.counts[stage] for stage in self.total_ms}
+
+class DetectionPipeline:
+    # capture thread -> frame queue -> inference thread -> result queue -> render (main thread)
+    def __init__(self, source=0, queue_size=2, model="yolov3", backend="default"):
+        self.model = load_model(model, backend)
+        self.cap = cv2.VideoCapture(source)
+        self.frame_queue = DropOldestQueue(queue_size)
+        self.result_queue = DropOldestQueue(queue_size)
+        self.stats = StageStats()
+        self.running = False
+        self.frames_captured = 0
+        self.frames_rendered = 0
+
+    def capture_loop(self):
+        while self.running:
+            start = time.perf_counter()
+            ret, img = self.cap.read()
+            if not ret:
+                self.running = False
+                break
+            captured_at = time.perf_counter()
+            self.stats.add("capture", (captured_at - start) * 1000)
+            self.frames_captured += 1
+            self.frame_queue.put((captured_at, img))
+
+    def inference_loop(self):
+        while self.running:
+            try:
+                captured_at, img = self.frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            self.stats.add("queue_wait", (start - captured_at) * 1000)
+            boxes, confidences, class_ids, decode_ms = self.model.detect(img)
+            self.stats.add("inference", (time.perf_counter() - start) * 1000 - decode_ms)
+            self.stats.add("decode", decode_ms)
+            self.result_queue.put((captured_at, img, boxes, class_ids))
+
+    def run(self):
+        self.running = True
+        workers = [threading.Thread(target=self.capture_loop, daemon=True),
+                   threading.Thread(target=self.inference_loop, daemon=True)]
+        for worker in workers:
+            worker.start()
+
+        while self.running:
+            try:
+                captured_at, img, boxes, class_ids = self.result_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            draw_detections(img, boxes, class_ids, self.model.classes, self.model.colors)
+            dropped = self.frame_queue.dropped + self.result_queue.dropped
+            cv2.putText(img, f"Latency: {(start - captured_at) * 1000:.0f} ms  Dropped: {dropped}",
+                        (10, 20), cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 0), 2)
+            cv2.imshow("YOLO Object Detection", img)
+            self.frames_rendered += 1
+            now = time.perf_counter()
+            self.stats.add("render", (now - start) * 1000)
+            self.stats.add("end_to_end", (now - captured_at) * 1000)
+
+            key = cv2.waitKey(1)
+            if key == 27:  # ESC key
+                self.running = False
+
+        for worker in workers:
+            worker.join(timeout=1.0)
+        self.cap.release()
+        cv2.destroyAllWindows()
+        self.report()
+
+    def report(self):
+        print(f"Frames captured: {self.frames_captured}, rendered: {self.frames_rendered}")
+        print(f"Frames dropped: capture->inference {self.frame_queue.dropped}, "
+              f"inference->render {self.result_queue.dropped}")
+        for stage, ms in self.stats.averages().items():
+            print(f"  {stage:>10}: {ms:.2f} ms")
+
+class CameraStream:
+    # One capture thread per camera. "latest" keeps only the newest frame,
+    # "buffered" keeps up to buffer_size frames and drops the oldest when full.
+    def __init__(self, index, source, drop_policy="latest", buffer_size=4):
+        self.index = index
+        self.source = source
+        self.drop_policy = drop_policy
+        self.cap = cv2.VideoCapture(source)
+        self.frames = DropOldestQueue(1 if drop_policy == "latest" else buffer_size)
+        self.running = False
+        self.thread = None
+        self.frames_captured = 0
+        self.frames_processed = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+
+    def capture_loop(self):
+        while self.running:
+            ret, img = self.cap.read()
+            if not ret:
+                self.running = False
+                break
+            self.frames_captured += 1
+            self.frames.put((time.perf_counter(), img))
+
+    def poll(self):
+        try:
+            return self.frames.get_nowait()
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        self.cap.release()
+
+class MultiCameraDetector:
+    # Loads the network once and runs a single batched forward pass per tick
+    # over whichever streams have a fresh frame; a stalled camera is skipped.
+    def __init__(self, sources, drop_policies=None, tick_ms=5, model="yolov3", backend="default"):
+        self.model = load_model(model, backend)
+        drop_policies = drop_policies or ["latest"] * len(sources)
+        if len(drop_policies) == 1:
+            drop_policies = drop_policies * len(sources)
+        self.streams = [CameraStream(i, source, policy)
+                        for i, (source, policy) in enumerate(zip(sources, drop_policies))]
+        self.tick_ms = tick_ms
+        self.forward_ms = {}  # batch size -> [total ms, batches]
+
+    def detect_batch(self, images, conf_threshold=0.5, nms_threshold=0.4):
+        start = time.perf_counter()
+        outs = self.model.forward(images)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        total, batches = self.forward_ms.get(len(images), (0.0, 0))
+        self.forward_ms[len(images)] = (total + elapsed_ms, batches + 1)
+
+        results = []
+        for img, img_outs in zip(images, self.model.split_batch(outs, len(images))):
+            height, width = img.shape[:2]
+            boxes, confidences, class_ids, _ = self.model.decode(img_outs, width, height,
+                                                                 conf_threshold, nms_threshold)
+            results.append((boxes, confidences, class_ids))
+        return results
+
+    def run(self):
+        for stream in self.streams:
+            stream.start()
+        start_time = time.perf_counter()
+
+        while any(stream.running for stream in self.streams):
+            ready = []
+            for stream in self.streams:
+                item = stream.poll()
+                if item is not None:
+                    ready.append((stream, item[1]))
+
+            if not ready:
+                time.sleep(self.tick_ms / 1000)
+                continue
+
+            results = self.detect_batch([img for _, img in ready])
+            for (stream, img), (boxes, _, class_ids) in zip(ready, results):
+                stream.frames_processed += 1
+                draw_detections(img, boxes, class_ids, self.model.classes, self.model.colors)
+                cv2.imshow(f"YOLO Object Detection - camera {stream.index}", img)
+
+            key = cv2.waitKey(1)
+            if key == 27:  # ESC key
+                break
+
+        elapsed = time.perf_counter() - start_time
+        for stream in self.streams:
+            stream.stop()
+        cv2.destroyAllWindows()
+        self.report(elapsed)
+
+    def report(self, elapsed):
+        for stream in self.streams:
+            print(f"Camera {stream.index} ({stream.source}, {stream.drop_policy}): "
+                  f"{stream.frames_processed / elapsed:.1f} FPS processed, "
+                  f"{stream.frames_captured} captured, {stream.frames.dropped} dropped")
+        print("Batch size vs forward time:")
+        for batch_size in sorted(self.forward_ms):
+            total, batches = self.forward_ms[batch_size]
+            avg_ms = total / batches
+            print(f"  batch {batch_size}: {avg_ms:.1f} ms/forward, {1000 / avg_ms:.1f} FPS per stream "
+                  f"({batches} batches)")
+
+def create_tracker(kind):
+    factories = {"kcf": "TrackerKCF_create", "csrt": "TrackerCSRT_create", "mosse": "TrackerMOSSE_create"}
+    # Depending on the OpenCV build the trackers live in cv2 or cv2.legacy
+    for module in (cv2, getattr(cv2, "legacy", None)):
+        if module is not None and hasattr(module, factories[kind]):
+            return getattr(module, factories[kind])()
+    raise ValueError(f"Tracker '{kind}' is not available in this OpenCV build (needs opencv-contrib)")
+
+class OpenCVTrackers:
+    # One KCF/CSRT/MOSSE tracker per box; confidence is the fraction still locked on
+    MIN_SIZE = 4
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.trackers = []
+
+    def init(self, img, boxes):
+        self.trackers = []
+        # Trackers reject empty or 1 px boxes, so clamp to the frame and a minimum size while
+        # keeping one tracker per box (boxes stay aligned with their class ids)
+        height, width = img.shape[:2]
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        x1 = np.clip(boxes[:, 0], 0, max(width - self.MIN_SIZE, 0))
+        y1 = np.clip(boxes[:, 1], 0, max(height - self.MIN_SIZE, 0))
+        x2 = np.clip(boxes[:, 0] + boxes[:, 2], x1 + self.MIN_SIZE, width)
+        y2 = np.clip(boxes[:, 1] + boxes[:, 3], y1 + self.MIN_SIZE, height)
+        for box in np.stack([x1, y1, x2 - x1, y2 - y1], axis=1):
+            tracker = create_tracker(self.kind)
+            tracker.init(img, tuple(int(v) for v in box))
+            self.trackers.append(tracker)
+
+    def update(self, img):
+        boxes = []
+        ok_count = 0
+        for tracker in self.trackers:
+            ok, box = tracker.update(img)
+            ok_count += int(ok)
+            boxes.append(box)
+        confidence = ok_count / len(self.trackers) if self.trackers else 1.0
+        return np.array(boxes, dtype=np.int32).reshape(-1, 4), confidence
+
+class FlowTracker:
+    # Sparse Lucas-Kanade flow on corners inside every box; boxes move by their median point shift
+    def __init__(self, max_corners=20):
+        self.max_corners = max_corners
+        self.prev_gray = None
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.points = np.zeros((0, 1, 2), dtype=np.float32)
+        self.owners = np.zeros(0, dtype=np.int32)
+
+    def init(self, img, boxes):
+        self.prev_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        points, owners = [], []
+        for i, (x, y, w, h) in enumerate(self.boxes.astype(np.int32)):
+            mask = np.zeros_like(self.prev_gray)
+            mask[max(y, 0):y + h, max(x, 0):x + w] = 255
+            corners = cv2.goodFeaturesToTrack(self.prev_gray, self.max_corners, 0.01, 5, mask=mask)
+            if corners is not None:
+                points.append(corners)
+                owners.append(np.full(len(corners), i, dtype=np.int32))
+        self.points = np.concatenate(points).astype(np.float32) if points else np.zeros((0, 1, 2), np.float32)
+        self.owners = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int32)
+        self.initial_points = len(self.points)
+
+    def update(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if len(self.points) == 0:
+            self.prev_gray = gray
+            return self.boxes.astype(np.int32), 0.0 if len(self.boxes) else 1.0
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None)
+        good = status.ravel() == 1
+        shifts = (next_points - self.points).reshape(-1, 2)
+        for i in range(len(self.boxes)):
+            owned = good & (self.owners == i)
+            if owned.any():
+                self.boxes[i, :2] += np.median(shifts[owned], axis=0)
+
+        self.points = next_points[good]
+        self.owners = self.owners[good]
+        self.prev_gray = gray
+        return self.boxes.astype(np.int32), len(self.points) / max(self.initial_points, 1)
+
+class DetectTrackScheduler:
+    # Runs the detector every K frames (or when tracking confidence drops) and
+    # propagates boxes with trackers in between. K shrinks when things move fast.
+    def __init__(self, model, tracker="kcf", k_min=2, k_max=15, min_confidence=0.6,
+                 low_motion=0.01, high_motion=0.1):
+        self.model = model
+        self.tracker = FlowTracker() if tracker == "flow" else OpenCVTrackers(tracker)
+        self.k_min = k_min
+        self.k_max = k_max
+        self.k = k_min
+        self.min_confidence = min_confidence
+        self.low_motion = low_motion
+        self.high_motion = high_motion
+        self.motion = 0.0
+        self.since_detection = None
+        self.boxes = np.zeros((0, 4), dtype=np.int32)
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.frames = 0
+        self.detections = 0
+
+    def adapt_k(self, previous_boxes, boxes):
+        if len(boxes) == 0 or len(boxes) != len(previous_boxes):
+            return
+        # Per-frame centre displacement relative to box size
+        centres = boxes[:, :2] + boxes[:, 2:] / 2
+        previous_centres = previous_boxes[:, :2] + previous_boxes[:, 2:] / 2
+        sizes = np.maximum(np.hypot(boxes[:, 2], boxes[:, 3]), 1)
+        motion = float(np.mean(np.hypot(*(centres - previous_centres).T) / sizes))
+        self.motion = 0.8 * self.motion + 0.2 * motion
+
+        ratio = (self.motion - self.low_motion) / (self.high_motion - self.low_motion)
+        ratio = min(max(ratio, 0.0), 1.0)
+        self.k = int(round(self.k_max - ratio * (self.k_max - self.k_min)))
+
+    def process(self, img):
+        self.frames += 1
+        confidence = 1.0
+        if self.since_detection is not None and self.since_detection < self.k:
+            previous_boxes = self.boxes
+            boxes, confidence = self.tracker.update(img)
+            if confidence >= self.min_confidence:
+                self.adapt_k(previous_boxes, boxes)
+                self.boxes = boxes
+                self.since_detection += 1
+                return self.boxes, self.class_ids, False
+
+        self.boxes, _, self.class_ids, _ = self.model.detect(img)
+        self.tracker.init(img, self.boxes)
+        self.detections += 1
+        self.since_detection = 0
+        return self.boxes, self.class_ids, True
+
+    @property
+    def duty_cycle(self):
+        return self.detections / self.frames if self.frames else 0.0
+
+def detect_and_track(source=0, model="yolov3", backend="default", tracker="kcf"):
+    model = load_model(model, backend)
+    scheduler = DetectTrackScheduler(model, tracker)
+    cap = cv2.VideoCapture(source)
+    start_time = time.perf_counter()
+
+    while True:
+        ret, img = cap.read()
+        if not ret:
+            break
+
+        boxes, class_ids, detected = scheduler.process(img)
+        draw_detections(img, boxes, class_ids, model.classes, model.colors)
+
+        elapsed = time.perf_counter() - start_time
+        cv2.putText(img, f"FPS: {scheduler.frames / elapsed:.1f}  K: {scheduler.k}  "
+                         f"Detector duty: {scheduler.duty_cycle * 100:.0f}%  {'DETECT' if detected else 'TRACK'}",
+                    (10, 20), cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 0), 2)
+        cv2.imshow("YOLO Object Detection", img)
+        key = cv2.waitKey(1)
+        if key == 27:  # ESC key
+            break
+
+    elapsed = time.perf_counter() - start_time
+    cap.release()
+    cv2.destroyAllWindows()
+    if scheduler.frames:
+        print(f"Frames: {scheduler.frames}, effective FPS: {scheduler.frames / elapsed:.1f}, "
+              f"detector ran on {scheduler.detections} frames ({scheduler.duty_cycle * 100:.1f}% duty cycle)")
+
+def box_iou(box, boxes):
+    # IoU of one (x, y, w, h) box against an (N, 4) array of boxes
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[0] + box[2], boxes[:, 0] + boxes[:, 2])
+    y2 = np.minimum(box[1] + box[3], boxes[:, 1] + boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box[2] * box[3] + boxes[:, 2] * boxes[:, 3] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+def average_precision(scored_hits, num_reference):
+    # scored_hits: list of (confidence, is_true_positive) for one class over the whole clip
+    if num_reference == 0:
+        return 0.0
+    if not scored_hits:
+        return 0.0
+    scored_hits = sorted(scored_hits, key=lambda hit: hit[0], reverse=True)
+    hits = np.array([hit[1] for hit in scored_hits], dtype=np.float64)
+    true_positives = np.cumsum(hits)
+    precision = true_positives / np.arange(1, len(hits) + 1)
+    recall = true_positives / num_reference
+
+    # All-point interpolation over the monotone precision envelope
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    recall = np.concatenate([[0.0], recall])
+    return float(np.sum((recall[1:] - recall[:-1]) * precision))
+
+def run_on_clip(model, clip, max_frames):
+    cap = cv2.VideoCapture(clip)
+    detections = []
+    elapsed = 0.0
+    while len(detections) < max_frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        start = time.perf_counter()
+        boxes, confidences, class_ids, _ = model.detect(img)
+        elapsed += time.perf_counter() - start
+        labels = [model.classes[class_id] for class_id in class_ids]
+        detections.append((boxes, confidences, labels))
+    cap.release()
+    fps = len(detections) / elapsed if elapsed > 0 else 0.0
+    return detections, fps
+
+def agreement_with_reference(reference, candidate, iou_threshold=0.5):
+    # Treat the reference model's detections as ground truth and score the candidate against them
+    scored_hits = {}
+    num_reference = {}
+    for (ref_boxes, _, ref_labels), (boxes, confidences, labels) in zip(reference, candidate):
+        for label in ref_labels:
+            num_reference[label] = num_reference.get(label, 0) + 1
+        matched = np.zeros(len(ref_boxes), dtype=bool)
+        ref_labels = np.array(ref_labels)
+        for i in np.argsort(-confidences):
+            hit = False
+            same_class = np.flatnonzero((ref_labels == labels[i]) & ~matched)
+            if len(same_class):
+                ious = box_iou(boxes[i], ref_boxes[same_class])
+                best = np.argmax(ious)
+                if ious[best] >= iou_threshold:
+                    matched[same_class[best]] = True
+                    hit = True
+            scored_hits.setdefault(labels[i], []).append((float(confidences[i]), hit))
+
+    aps = [average_precision(scored_hits.get(label, []), count) for label, count in num_reference.items()]
+    return float(np.mean(aps)) if aps else 0.0
+
+def benchmark_models(clip, models, reference="yolov3", backend="default", max_frames=200):
+    print(f"Running reference model {reference} on {clip}...")
+    reference_detections, reference_fps = run_on_clip(load_model(reference, backend), clip, max_frames)
+    print(f"{'model':<20}{'backend':<12}{'input':<10}{'FPS':>8}{'mAP-proxy':>12}")
+    print(f"{reference:<20}{backend:<12}{'x'.join(map(str, MODEL_ZOO[reference]['size'])):<10}"
+          f"{reference_fps:>8.1f}{1.0:>12.3f}")
+
+    for name in models:
+        if name == reference:
+            continue
+        try:
+            model = load_model(name, backend)
+        except (cv2.error, OSError) as e:
+            print(f"{name:<20}skipped: {e}")
+            continue
+        detections, fps = run_on_clip(model, clip, max_frames)
+        score = agreement_with_reference(reference_detections, detections)
+        print(f"{name:<20}{backend:<12}{'x'.join(map(str, MODEL_ZOO[name]['size'])):<10}"
+              f"{fps:>8.1f}{score:>12.3f}")
+
+def yolo_object_detection(source=0, model="yolov3", backend="default"):
+    # Load model
+    model = load_model(model, backend)
 
     # Loading camera
-    cap = cv2.VideoCapture(0)
-    
+    cap = cv2.VideoCapture(source)
+
+    # Decode timing
+    decode_total_ms = 0.0
+    decode_frames = 0
+
     while True:
-        _, img = cap.read()
-        height, width, channels = img.shape
+        ret, img = cap.read()
+        if not ret:
+            break
 
         # Detecting objects
-        blob = cv2.dnn.blobFromImage(img, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-        net.setInput(blob)
-        outs = net.forward(output_layers)
+        boxes, confidences, class_ids, decode_ms = model.detect(img)
+        decode_total_ms += decode_ms
+        decode_frames += 1
 
         # Showing information on the screen
-        class_ids = []
-        confidences = []
-        boxes = []
-        for out in outs:
-            for detection in out:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                if confidence > 0.5:
-                    # Object detected
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w = int(detection[2] * width)
-                    h = int(detection[3] * height)
-                    
-                    # Rectangle coordinates
-                    x = int(center_x - w / 2)
-                    y = int(center_y - h / 2)
-                    
-                    boxes.append([x, y, w, h])
-                    confidences.append(float(confidence))
-                    class_ids.append(class_id)
-                    
-        indexes = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
-        
-        font = cv2.FONT_HERSHEY_PLAIN
-        for i in range(len(boxes)):
-            if i in indexes:
-                x, y, w, h = boxes[i]
-                label = str(classes[class_ids[i]])
-                color = colors[i]
-                cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
-                cv2.putText(img, label, (x, y + 30), font, 3, color, 3)
-                
+        draw_detections(img, boxes, class_ids, model.classes, model.colors)
+        cv2.putText(img, f"Decode: {decode_ms:.2f} ms (avg {decode_total_ms / decode_frames:.2f} ms)",
+                    (10, 20), cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 0), 2)
+
         cv2.imshow("YOLO Object Detection", img)
         key = cv2.waitKey(1)
         if key == 27:  # ESC key
             break
-            
+
     cap.release()
     cv2.destroyAllWindows()
 
+    if decode_frames:
+        print(f"Decoded {decode_frames} frames, average decode time {decode_total_ms / decode_frames:.2f} ms")
+
 if __name__ == "__main__":
-    yolo_object_detection()
+    parser = argparse.ArgumentParser(description="YOLO object detection")
+    parser.add_argument("--source", default="0", help="camera index or video file")
+    parser.add_argument("--model", default="yolov3", choices=list(MODEL_ZOO), help="detection model")
+    parser.add_argument("--backend", default="default", choices=list(DNN_BACKENDS),
+                        help="DNN backend/target (only those available in this OpenCV build will load)")
+    parser.add_argument("--benchmark", metavar="CLIP",
+                        help="report FPS and agreement with --reference for every model on a recorded clip")
+    parser.add_argument("--reference", default="yolov3", choices=list(MODEL_ZOO),
+                        help="reference model for --benchmark")
+    parser.add_argument("--max-frames", type=int, default=200, help="frames to use for --benchmark")
+    parser.add_argument("--track", choices=["kcf", "csrt", "mosse", "flow"],
+                        help="run the detector on keyframes only and track objects in between")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run capture, inference and render on separate threads")
+    parser.add_argument("--multi", nargs="+", metavar="SOURCE",
+                        help="run batched inference over several cameras or video files")
+    parser.add_argument("--drop-policy", nargs="+", choices=["latest", "buffered"], default=["latest"],
+                        help="per-stream drop policy for --multi (one value, or one per source)")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    if args.benchmark:
+        benchmark_models(args.benchmark, list(MODEL_ZOO), args.reference, args.backend, args.max_frames)
+    elif args.multi:
+        sources = [int(s) if s.isdigit() else s for s in args.multi]
+        MultiCameraDetector(sources, args.drop_policy, model=args.model, backend=args.backend).run()
+    elif args.track:
+        detect_and_track(source, args.model, args.backend, args.track)
+    elif args.threaded:
+        DetectionPipeline(source, model=args.model, backend=args.backend).run()
+    else:
+        yolo_object_detection(source, args.model, args.backend)
@@ -1,14 +1,18 @@
+import argparse
 import cv2
-import winsound
-import numpy as np
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import threading
 import time
+from clip_recorder import ClipRecorder
+from event_dispatch import EventDispatcher, LogFileSink, MotionEvent, SoundSink, WebhookSink
+from frame_source import FrameMailbox
+from motion_engine import MotionEngine, benchmark_motion_scales
 
 class SecurityCameraApp:
-    def __init__(self, root):
+    def __init__(self, root, webhook_url=None, motion_mode="diff", record_dir=None, pre_seconds=5.0, post_seconds=5.0,
+                 ui_fps=15, display_size=(800, 600)):
         self.root = root
         self.root.title("Advanced Security Camera")
         self.root.geometry("1000x700")
@@ -17,9 +21,27 @@ class SecurityCameraApp:
         # Variables
         self.is_running = False
         self.sensitivity = 5000  # Default sensitivity
+        self.processing_scale = 1.0  # Motion is detected on a frame resized by this factor
         self.alarm_enabled = True
         self.webcam = None
         self.current_frame = None
+        self.frame_index = 0
+        self.motion_mode = motion_mode
+        
+        # Detection publishes its newest frame here; the Tk loop redraws at most ui_fps times a second
+        self.mailbox = FrameMailbox()
+        self.ui_interval = max(1, int(1000 / ui_fps))
+        self.display_size = display_size
+        self.display_sequence = 0
+        self.display_buffer = None
+        self.photo = None
+        
+        # Alarms are dispatched on a worker thread, debounced and rate-limited
+        self.sound_sink = SoundSink()
+        sinks = [self.sound_sink, LogFileSink("motion_events.log")]
+        if webhook_url:
+            sinks.append(WebhookSink(webhook_url))
+        self.events = EventDispatcher(sinks)
         
         # Setup UI
         self.setup_ui()
@@ -27,6 +49,17 @@ class SecurityCameraApp:
         # Initialize webcam
         self.init_webcam()
         
+        self.root.bind("<Escape>", lambda event: self.on_closing())
+        # A focused button already handles its own space press
+        self.root.bind("<space>", lambda event: None if isinstance(event.widget, ttk.Button) else self.toggle_detection())
+        self.root.after(self.ui_interval, self.refresh_ui)
+        
+        # Clips of each incident, including the seconds before it, are encoded off the detection thread
+        self.recorder = None
+        if record_dir and self.webcam is not None:
+            fps = self.webcam.get(cv2.CAP_PROP_FPS) or 20.0
+            self.recorder = ClipRecorder(fps, pre_seconds, post_seconds, output_dir=record_dir)
+        
     def setup_ui(self):
         # Main frames
         control_frame = tk.Frame(self.root, bg='#2c3e50', padx=10, pady=10)
@@ -60,6 +93,14 @@ class SecurityCameraApp:
                                   highlightthickness=0, command=self.update_sensitivity)
         self.sens_scale.set(self.sensitivity)
         
+        # Processing scale
+        tk.Label(sens_frame, text="Processing scale:", fg="white", bg="#2c3e50").pack(anchor=tk.W)
+        self.scale_var = tk.StringVar(value=str(self.processing_scale))
+        scale_box = ttk.Combobox(sens_frame, textvariable=self.scale_var, values=["1.0", "0.5", "0.25"],
+                                 state="readonly", width=6)
+        scale_box.bind("<<ComboboxSelected>>", self.update_processing_scale)
+        scale_box.pack(anchor=tk.W)
+        
         # Alarm toggle
         self.alarm_var = tk.BooleanVar(value=True)
         alarm_check = tk.Checkbutton(control_frame, text="Enable Alarm", variable=self.alarm_var,
@@ -126,26 +167,26 @@ class SecurityCameraApp:
     def update_sensitivity(self, value):
         self.sensitivity = int(value)
         
+    def update_processing_scale(self, event=None):
+        self.processing_scale = float(self.scale_var.get())
+        
     def toggle_alarm(self):
         self.alarm_enabled = self.alarm_var.get()
+        self.sound_sink.enabled = self.alarm_enabled
         
     def detect_motion(self):
-        # Initialize background subtractor
-        back_sub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
+        # Compares every frame with the previous one (or a background model), one read per frame
+        engine = MotionEngine(self.motion_mode, self.sensitivity, self.processing_scale)
         
         # For frame rate calculation
         prev_time = 0
         
         while self.is_running:
             try:
-                # Read frames
+                # Read frame
                 ret, frame1 = self.webcam.read()
                 if not ret:
                     continue
-                    
-                ret, frame2 = self.webcam.read()
-                if not ret:
-                    continue
                 
                 # Calculate FPS
                 current_time = time.time()
@@ -154,50 +195,25 @@ class SecurityCameraApp:
                 
                 # Flip frame for mirror effect
                 frame1 = cv2.flip(frame1, 1)
-                frame2 = cv2.flip(frame2, 1)
-                
-                # Convert to grayscale
-                gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-                gray2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
                 
-                # Calculate absolute difference
-                diff = cv2.absdiff(gray1, gray2)
+                # Pick up UI changes
+                engine.sensitivity = self.sensitivity
+                engine.set_scale(self.processing_scale)
                 
-                # Apply threshold
-                _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+                boxes = engine.process(frame1)
                 
-                # Dilate to fill holes
-                kernel = np.ones((5, 5), np.uint8)
-                thresh = cv2.dilate(thresh, kernel, iterations=2)
+                self.frame_index += 1
+                motion_detected = len(boxes) > 0
+                self.motion_count += len(boxes)
                 
-                # Find contours
-                contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                motion_detected = False
-                
-                for contour in contours:
-                    if cv2.contourArea(contour) < self.sensitivity:
-                        continue
-                    
-                    motion_detected = True
-                    self.motion_count += 1
-                    
+                for x, y, w, h in boxes:
                     # Draw bounding box
-                    x, y, w, h = cv2.boundingRect(contour)
                     cv2.rectangle(frame1, (x, y), (x + w, y + h), (0, 0, 255), 2)
-                    
-                    # Trigger alarm if enabled
-                    if self.alarm_enabled:
-                        winsound.Beep(500, 100)
                 
-                # Update motion indicator
+                # One event per frame, however many contours fired; never blocks
                 if motion_detected:
-                    self.motion_indicator.config(text="MOTION DETECTED", fg="#e74c3c")
-                else:
-                    self.motion_indicator.config(text="NO MOTION", fg="#2ecc71")
-                
-                # Update motion counter
-                self.motion_counter.config(text=f"Motions Detected: {self.motion_count}")
+                    self.events.publish(MotionEvent(time.time(), boxes, sum(w * h for _, _, w, h in boxes),
+                                                    self.frame_index))
                 
                 # Add info text to frame
                 cv2.putText(frame1, f"FPS: {int(fps)}", (10, 30), 
@@ -208,36 +224,76 @@ class SecurityCameraApp:
                 cv2.putText(frame1, f"Status: {status_text}", (10, 90), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                 
-                # Convert frame for display in Tkinter
-                frame_rgb = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-                img.thumbnail((800, 600))  # Resize image to fit GUI
-                img_tk = ImageTk.PhotoImage(img)
-                
-                # Update GUI from main thread
-                self.root.after(0, self.update_display, img_tk)
+                # Hand the finished frame to the recorder; frame1 is not drawn on after this
+                if self.recorder:
+                    if motion_detected:
+                        self.recorder.trigger()
+                    self.recorder.push(frame1)
                 
-                # Check for exit key
-                if cv2.waitKey(10) == 27:  
-                    self.is_running = False
-                    break
+                # Publish for the UI; Tk widgets are only touched from the main loop
+                self.mailbox.put(frame1, (motion_detected, self.motion_count))
                     
             except Exception as e:
                 print(f"Error in motion detection: {e}")
                 continue
                 
-    def update_display(self, img):
-        self.video_label.configure(image=img)
-        self.video_label.image = img
+    def refresh_ui(self):
+        # Runs on the Tk main loop only; skips the redraw if detection has not produced a new frame
+        sequence, frame, stats = self.mailbox.get(self.display_sequence)
+        if frame is not None:
+            self.display_sequence = sequence
+            self.update_display(frame)
+            motion_detected, motion_count = stats
+            if motion_detected:
+                self.motion_indicator.config(text="MOTION DETECTED", fg="#e74c3c")
+            else:
+                self.motion_indicator.config(text="NO MOTION", fg="#2ecc71")
+            self.motion_counter.config(text=f"Motions Detected: {motion_count}")
+        self.root.after(self.ui_interval, self.refresh_ui)
+        
+    def update_display(self, frame):
+        # Fit inside display_size without upscaling, resizing into a reused buffer
+        height, width = frame.shape[:2]
+        fit = min(1.0, self.display_size[0] / width, self.display_size[1] / height)
+        size = (max(1, int(width * fit)), max(1, int(height * fit)))
+        if self.display_buffer is None or self.display_buffer.shape[1::-1] != size:
+            self.display_buffer = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA),
+                                               cv2.COLOR_BGR2RGB)
+            self.photo = ImageTk.PhotoImage(Image.fromarray(self.display_buffer))
+            self.video_label.configure(image=self.photo)
+        else:
+            cv2.resize(frame, size, dst=self.display_buffer, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.display_buffer, cv2.COLOR_BGR2RGB, dst=self.display_buffer)
+            # Paste into the existing PhotoImage instead of building a new one per frame
+            self.photo.paste(Image.fromarray(self.display_buffer))
         
     def on_closing(self):
         self.is_running = False
+        self.events.stop()
+        if self.recorder:
+            self.recorder.stop()
         if self.webcam:
             self.webcam.release()
         self.root.destroy()
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = SecurityCameraApp(root)
-    root.protocol("WM_DELETE_WINDOW", app.on_closing)
-    root.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Security camera")
+    parser.add_argument("--webhook", metavar="URL", help="also POST alarms to this local webhook")
+    parser.add_argument("--motion-mode", default="diff", choices=MotionEngine.MODES,
+                        help="compare with the previous frame, a running average or a MOG2 background")
+    parser.add_argument("--record-dir", metavar="DIR", help="save a clip of every motion incident to DIR")
+    parser.add_argument("--pre-seconds", type=float, default=5.0, help="seconds of video kept before an incident")
+    parser.add_argument("--post-seconds", type=float, default=5.0, help="seconds recorded after the last motion")
+    parser.add_argument("--ui-fps", type=int, default=15, help="maximum display refresh rate")
+    parser.add_argument("--benchmark-scale", action="store_true",
+                        help="report per-frame motion detection time at 1x, 0.5x and 0.25x")
+    args = parser.parse_args()
+
+    if args.benchmark_scale:
+        benchmark_motion_scales()
+    else:
+        root = tk.Tk()
+        app = SecurityCameraApp(root, args.webhook, args.motion_mode, args.record_dir,
+                               args.pre_seconds, args.post_seconds, args.ui_fps)
+        root.protocol("WM_DELETE_WINDOW", app.on_closing)
+        root.mainloop()
\ No newline at end of file
@@ -0,0 +1,335 @@
+# security_daemon.py
+# Headless security camera for unattended boxes: the same motion pipeline as the Tk app,
+# configured from an INI file, with a local HTTP endpoint for Prometheus-style metrics
+# (/metrics) and an MJPEG preview (/preview.mjpg) that is only encoded while someone watches.
+import argparse
+import configparser
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+from clip_recorder import ClipRecorder
+from event_dispatch import EventDispatcher, LogFileSink, MotionEvent, SoundSink, WebhookSink
+from frame_source import FrameMailbox
+from motion_engine import MotionEngine
+
+DEFAULT_CONFIG = {
+    "camera": {"source": "0", "mirror": "no"},
+    "motion": {"mode": "diff", "sensitivity": "5000", "scale": "0.5", "threshold": "30"},
+    "alarms": {"sound": "no", "log_file": "motion_events.log", "webhook": "",
+               "debounce": "1.0", "rate": "0.5", "realarm": "30"},
+    "recording": {"dir": "", "pre_seconds": "5", "post_seconds": "5"},
+    "http": {"host": "127.0.0.1", "port": "8090", "preview_fps": "10", "jpeg_quality": "70"},
+}
+
+STAGES = ("read", "motion", "dispatch")
+
+def load_config(path=None):
+    config = configparser.ConfigParser()
+    config.read_dict(DEFAULT_CONFIG)
+    if path and not config.read(path):
+        raise FileNotFoundError(f"Config file '{path}' not found")
+    return config
+
+class Metrics:
+    # Counters and per-stage latency summaries, rendered in the Prometheus text format
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames_processed = 0
+        self.motion_frames = 0
+        self.fps = 0.0
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+        self.stage_count = {stage: 0 for stage in STAGES}
+        self.stage_last = {stage: 0.0 for stage in STAGES}
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_count[stage] += 1
+            self.stage_last[stage] = seconds
+
+    def frame_done(self, motion, fps):
+        with self.lock:
+            self.frames_processed += 1
+            self.motion_frames += int(motion)
+            self.fps = fps
+
+    def render(self, daemon):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        def summary(name, help_text, sums, counts):
+            # A summary without quantiles: one family with _sum and _count samples per label set
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for labels in sums:
+                lines.append(f"{name}_sum{labels} {sums[labels]}")
+                lines.append(f"{name}_count{labels} {counts[labels]}")
+
+        with self.lock:
+            metric("security_frames_processed_total", "counter", "Frames run through motion detection.",
+                   [("", self.frames_processed)])
+            metric("security_frames_dropped_total", "counter",
+                   "Camera frames replaced before detection picked them up.",
+                   [("", daemon.frames.overwritten)])
+            metric("security_fps", "gauge", "Detection frame rate.", [("", f"{self.fps:.2f}")])
+            metric("security_motion_frames_total", "counter", "Frames with at least one motion box.",
+                   [("", self.motion_frames)])
+            summary("security_stage_latency_seconds", "Time spent per pipeline stage.",
+                    {f'{{stage="{stage}"}}': f"{seconds:.6f}" for stage, seconds in self.stage_seconds.items()},
+                    {f'{{stage="{stage}"}}': count for stage, count in self.stage_count.items()})
+            metric("security_stage_latency_last_seconds", "gauge", "Latency of the last frame per stage.",
+                   [(f'{{stage="{stage}"}}', f"{seconds:.6f}") for stage, seconds in self.stage_last.items()])
+
+        events = daemon.events
+        metric("security_motion_events_total", "counter", "Motion events published to the dispatcher.",
+               [("", events.events_received)])
+        metric("security_motion_events_dropped_total", "counter", "Motion events dropped by a full queue.",
+               [("", events.events_dropped)])
+        metric("security_alarms_sent_total", "counter", "Alarms sent after debouncing and rate limiting.",
+               [("", events.alarms_sent)])
+        if daemon.recorder:
+            metric("security_clips_written_total", "counter", "Motion clips written to disk.",
+                   [("", daemon.recorder.clips_written)])
+            metric("security_clip_frames_dropped_total", "counter", "Frames the clip recorder could not keep up with.",
+                   [("", daemon.recorder.frames_dropped)])
+        metric("security_preview_clients", "gauge", "Connected MJPEG preview clients.", [("", daemon.preview.clients)])
+        metric("security_preview_frames_encoded_total", "counter", "JPEG frames encoded for the preview.",
+               [("", daemon.preview.frames_encoded)])
+        metric("security_uptime_seconds", "gauge", "Seconds since the daemon started.",
+               [("", f"{time.time() - self.started:.0f}")])
+        return "\n".join(lines) + "\n"
+
+class PreviewEncoder:
+    # Encodes the newest annotated frame once per sequence number, however many clients
+    # are watching, and not at all when nobody is
+    def __init__(self, mailbox, quality=70, fps=10):
+        self.mailbox = mailbox
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.interval = 1.0 / fps
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.jpeg = None
+        self.clients = 0
+        self.frames_encoded = 0
+
+    def connect(self):
+        with self.lock:
+            self.clients += 1
+
+    def disconnect(self):
+        with self.lock:
+            self.clients -= 1
+
+    def next_jpeg(self, last_sequence, timeout=2.0):
+        sequence, frame, _ = self.mailbox.wait(last_sequence, timeout)
+        if frame is None:
+            return last_sequence, None
+        with self.lock:
+            if sequence != self.sequence:
+                ok, encoded = cv2.imencode(".jpg", frame, self.params)
+                if not ok:
+                    return last_sequence, None
+                self.sequence, self.jpeg = sequence, encoded.tobytes()
+                self.frames_encoded += 1
+            return self.sequence, self.jpeg
+
+def make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = daemon.metrics.render(daemon).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif self.path == "/preview.mjpg":
+                self.stream_preview()
+            elif self.path == "/":
+                body = b'<html><body><img src="/preview.mjpg"></body></html>'
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error(404)
+
+        def stream_preview(self):
+            preview = daemon.preview
+            self.send_response(200)
+            self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            preview.connect()
+            sequence = None
+            try:
+                while daemon.running:
+                    start = time.perf_counter()
+                    sequence, jpeg = preview.next_jpeg(sequence)
+                    if jpeg is None:
+                        continue
+                    self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                    self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                    self.wfile.write(jpeg + b"\r\n")
+                    time.sleep(max(0.0, preview.interval - (time.perf_counter() - start)))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                preview.disconnect()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+class SecurityDaemon:
+    def __init__(self, config):
+        self.config = config
+        camera = config["camera"]
+        source = camera.get("source")
+        self.source = int(source) if source.isdigit() else source
+        self.mirror = camera.getboolean("mirror")
+
+        motion = config["motion"]
+        self.engine = MotionEngine(motion.get("mode"), motion.getint("sensitivity"),
+                                   motion.getfloat("scale"), motion.getint("threshold"))
+
+        alarms = config["alarms"]
+        sinks = []
+        if alarms.getboolean("sound"):
+            sinks.append(SoundSink())
+        if alarms.get("log_file"):
+            sinks.append(LogFileSink(alarms.get("log_file")))
+        if alarms.get("webhook"):
+            sinks.append(WebhookSink(alarms.get("webhook")))
+        self.events = EventDispatcher(sinks, debounce=alarms.getfloat("debounce"), rate=alarms.getfloat("rate"),
+                                      realarm=alarms.getfloat("realarm"))
+
+        self.webcam = None
+        self.recorder = None
+        self.frames = FrameMailbox()  # camera -> detection; overwrites count as dropped frames
+        self.annotated = FrameMailbox()  # detection -> preview
+        http = config["http"]
+        self.preview = PreviewEncoder(self.annotated, http.getint("jpeg_quality"), http.getfloat("preview_fps"))
+        self.metrics = Metrics()
+        self.server = ThreadingHTTPServer((http.get("host"), http.getint("port")), make_handler(self))
+        self.server.daemon_threads = True
+        self.running = False
+
+    def open_camera(self):
+        self.webcam = cv2.VideoCapture(self.source)
+        if not self.webcam.isOpened():
+            raise RuntimeError(f"Cannot open camera {self.source}")
+        recording = self.config["recording"]
+        if recording.get("dir"):
+            fps = self.webcam.get(cv2.CAP_PROP_FPS) or 20.0
+            self.recorder = ClipRecorder(fps, recording.getfloat("pre_seconds"), recording.getfloat("post_seconds"),
+                                         output_dir=recording.get("dir"))
+
+    def capture_loop(self):
+        # Reads as fast as the camera delivers so detection always gets the newest frame
+        # Video files are replayed at their own frame rate, as a camera would deliver them
+        interval = 1.0 / (self.webcam.get(cv2.CAP_PROP_FPS) or 20.0) if isinstance(self.source, str) else 0.0
+        while self.running:
+            start = time.perf_counter()
+            ret, frame = self.webcam.read()
+            if not ret:
+                if isinstance(self.source, str):
+                    # End of a video file
+                    self.running = False
+                    break
+                continue
+            self.metrics.observe("read", time.perf_counter() - start)
+            self.frames.put(frame)
+            if interval:
+                time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+    def detect_loop(self):
+        sequence = None
+        frame_index = 0
+        prev_time = 0
+        while self.running:
+            sequence, frame, _ = self.frames.wait(sequence, timeout=1.0)
+            if frame is None:
+                continue
+
+            current_time = time.time()
+            fps = 1 / (current_time - prev_time) if prev_time > 0 else 0
+            prev_time = current_time
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+
+            start = time.perf_counter()
+            boxes = self.engine.process(frame)
+            self.metrics.observe("motion", time.perf_counter() - start)
+
+            frame_index += 1
+            start = time.perf_counter()
+            if boxes:
+                self.events.publish(MotionEvent(current_time, boxes, sum(w * h for _, _, w, h in boxes), frame_index))
+            # Only draw when the frame will be seen: by a preview client or in a clip
+            if self.preview.clients or self.recorder:
+                for x, y, w, h in boxes:
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+            if self.recorder:
+                if boxes:
+                    self.recorder.trigger()
+                self.recorder.push(frame)
+            if self.preview.clients:
+                self.annotated.put(frame)
+            self.metrics.observe("dispatch", time.perf_counter() - start)
+            self.metrics.frame_done(bool(boxes), fps)
+
+    def run(self):
+        self.open_camera()
+        self.running = True
+        threads = [threading.Thread(target=self.capture_loop, daemon=True),
+                   threading.Thread(target=self.detect_loop, daemon=True),
+                   threading.Thread(target=self.server.serve_forever, daemon=True)]
+        for thread in threads:
+            thread.start()
+        host, port = self.server.server_address[:2]
+        print(f"Security daemon watching {self.source}; metrics at http://{host}:{port}/metrics, "
+              f"preview at http://{host}:{port}/preview.mjpg")
+        try:
+            while self.running:
+                time.sleep(0.5)
+        finally:
+            self.stop()
+            for thread in threads[:2]:
+                thread.join(timeout=2.0)
+
+    def stop(self):
+        self.running = False
+        self.server.shutdown()
+        self.server.server_close()
+        self.events.stop()
+        if self.recorder:
+            self.recorder.stop()
+        if self.webcam:
+            self.webcam.release()
+            self.webcam = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless security camera with metrics and MJPEG preview")
+    parser.add_argument("--config", help="INI file; see DEFAULT_CONFIG for sections and keys")
+    parser.add_argument("--print-config", action="store_true", help="print the effective config and exit")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.print_config:
+        config.write(sys.stdout)
+    else:
+        daemon = SecurityDaemon(config)
+        signal.signal(signal.SIGTERM, lambda signum, frame: setattr(daemon, "running", False))
+        daemon.run()
@@ -0,0 +1,236 @@
+# smile_engine.py
+# Mouth landmarks for the smile selfie, in one of three modes:
+#   full - refined 478-point Face Mesh on the whole frame (the original behaviour)
+#   mesh - 468-point Face Mesh on the whole frame, no iris refinement
+#   fast - face detection once, then an unrefined mesh on the face ROI only, with the ROI
+#          tracked from the mesh itself until the face is lost
+# While no face is present only every `idle_skip`-th frame is processed. SmileScorer turns
+# the landmarks into a distance-independent, temporally filtered capture trigger.
+import argparse
+import time
+from collections import deque
+import cv2
+import numpy as np
+from landmarks import FACE_SIDES, MOUTH_CORNERS, OUTER_EYE_CORNERS, landmarks_array, pair_distance
+from model_registry import get_mediapipe
+
+SMILE_MODES = ("full", "mesh", "fast")
+
+# Forehead, chin and both cheeks: enough to re-centre the ROI on the next frame
+ROI_TRACK_IDS = (10, 152, 234, 454)
+
+# Columns of the landmark array the scorer works on
+SMILE_LANDMARKS = MOUTH_CORNERS + OUTER_EYE_CORNERS + FACE_SIDES
+MOUTH, EYES, SIDES = (0, 1), (2, 3), (4, 5)
+
+class SmileLandmarkEngine:
+    def __init__(self, mode="fast", indices=None, idle_skip=3, roi_margin=0.3, min_confidence=0.5):
+        if mode not in SMILE_MODES:
+            raise ValueError(f"Unknown smile mode '{mode}', choose from: {', '.join(SMILE_MODES)}")
+        self.mode = mode
+        self.indices = tuple(SMILE_LANDMARKS if indices is None else indices)
+        self.idle_skip = idle_skip
+        self.roi_margin = roi_margin
+        self.roi = None
+        self.idle = False
+        self.frames = 0
+        self.frames_skipped = 0
+        self.latencies = deque(maxlen=1000)
+
+        # static_image_mode=False lets the mesh track between frames instead of re-detecting
+        if mode == "full":
+            self.mesh = get_mediapipe("face_mesh", refine_landmarks=True, static_image_mode=False,
+                                      min_detection_confidence=min_confidence)
+        elif mode == "mesh":
+            self.mesh = get_mediapipe("face_mesh", refine_landmarks=False, static_image_mode=False,
+                                      min_detection_confidence=min_confidence)
+        else:
+            # Tracks the most prominent face only
+            self.mesh = get_mediapipe("face_mesh", refine_landmarks=False, static_image_mode=False,
+                                      max_num_faces=1, min_detection_confidence=min_confidence)
+            self.detector = get_mediapipe("face_detection", model_selection=0,
+                                          min_detection_confidence=min_confidence)
+
+    def process(self, image):
+        # BGR frame -> (faces, len(indices), 3) pixel landmarks, or None if the frame was skipped
+        self.frames += 1
+        if self.idle and self.frames % self.idle_skip:
+            self.frames_skipped += 1
+            return None
+
+        start = time.perf_counter()
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        if self.mode == "fast":
+            points = self.process_roi(rgb)
+        else:
+            height, width = rgb.shape[:2]
+            output = self.mesh.process(rgb)
+            points = landmarks_array(output.multi_face_landmarks, self.indices, (width, height))
+        self.latencies.append(time.perf_counter() - start)
+        self.idle = len(points) == 0
+        return points
+
+    def expand(self, x0, y0, x1, y1, width, height):
+        # Square box around the face with a margin, clipped to the frame
+        size = max(x1 - x0, y1 - y0) * (1 + 2 * self.roi_margin)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        return (max(0, int(cx - size / 2)), max(0, int(cy - size / 2)),
+                min(width, int(cx + size / 2)), min(height, int(cy + size / 2)))
+
+    def process_roi(self, rgb):
+        height, width = rgb.shape[:2]
+        empty = np.empty((0, len(self.indices), 3), np.float32)
+        if self.roi is None:
+            detections = self.detector.process(rgb).detections
+            if not detections:
+                return empty
+            box = detections[0].location_data.relative_bounding_box
+            self.roi = self.expand(box.xmin * width, box.ymin * height, (box.xmin + box.width) * width,
+                                   (box.ymin + box.height) * height, width, height)
+
+        x0, y0, x1, y1 = self.roi
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            self.roi = None
+            return empty
+        crop = np.ascontiguousarray(rgb[y0:y1, x0:x1])
+        output = self.mesh.process(crop)
+        if not output.multi_face_landmarks:
+            # Lost the face: detect again on the next processed frame
+            self.roi = None
+            return empty
+
+        points = landmarks_array(output.multi_face_landmarks, self.indices + ROI_TRACK_IDS, (x1 - x0, y1 - y0))
+        points[..., 0] += x0
+        points[..., 1] += y0
+        track = points[0, len(self.indices):, :2]
+        (tx0, ty0), (tx1, ty1) = track.min(axis=0), track.max(axis=0)
+        self.roi = self.expand(tx0, ty0, tx1, ty1, width, height)
+        return points[:, :len(self.indices)]
+
+    def latency_ms(self):
+        # (mean, p95) over the recent processed frames
+        if not self.latencies:
+            return 0.0, 0.0
+        samples = np.array(self.latencies) * 1000
+        return float(samples.mean()), float(np.percentile(samples, 95))
+
+def smile_ratio(points, reference="face"):
+    # Mouth width over face width (or outer inter-ocular distance) per face, so the score
+    # does not depend on how far the face is from the camera
+    a, b = SIDES if reference == "face" else EYES
+    return pair_distance(points, *MOUTH) / np.maximum(pair_distance(points, a, b), 1e-6)
+
+class SmileScorer:
+    # The widest smile ratio in the frame is smoothed with an EMA. A smile starts once the
+    # smoothed score stays above `threshold` for `hold` frames and ends when it drops below
+    # threshold - hysteresis; each onset fires one capture, at most once per `cooldown` seconds.
+    def __init__(self, threshold=0.46, hysteresis=0.04, alpha=0.3, hold=3, cooldown=2.0, reference="face"):
+        self.threshold = threshold
+        self.release = threshold - hysteresis
+        self.alpha = alpha
+        self.hold = hold
+        self.cooldown = cooldown
+        self.reference = reference
+        self.last_fired = None
+        self.events = 0
+        self.reset()
+
+    def reset(self):
+        self.score = None
+        self.above = 0
+        self.smiling = False
+
+    def update(self, points, timestamp):
+        # points: (faces, len(SMILE_LANDMARKS), 3), empty with no face, None for a skipped frame.
+        # Returns (fired, smoothed score)
+        if points is None:
+            return False, self.score or 0.0
+        if len(points) == 0:
+            self.reset()
+            return False, 0.0
+        return self.update_ratio(float(smile_ratio(points, self.reference).max()), timestamp)
+
+    def update_ratio(self, ratio, timestamp):
+        self.score = ratio if self.score is None else self.score + self.alpha * (ratio - self.score)
+        if self.smiling:
+            if self.score < self.release:
+                self.smiling = False
+                self.above = 0
+            return False, self.score
+
+        self.above = self.above + 1 if self.score > self.threshold else 0
+        if self.above < self.hold:
+            return False, self.score
+        self.smiling = True
+        if self.last_fired is not None and timestamp - self.last_fired < self.cooldown:
+            return False, self.score
+        self.last_fired = timestamp
+        self.events += 1
+        return True, self.score
+
+def load_labels(path):
+    # One "start end" frame range per line where the subject is smiling; '#' starts a comment
+    ranges = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if line:
+                start, end = line.replace(",", " ").split()[:2]
+                ranges.append((int(start), int(end)))
+    return ranges
+
+def run_session(session, mode, threshold=0.46, cooldown=2.0, max_frames=None):
+    # Replays a recorded video through one mode; returns the engine, trigger frames and per-frame smile flags
+    capture = cv2.VideoCapture(session)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    engine = SmileLandmarkEngine(mode)
+    scorer = SmileScorer(threshold, cooldown=cooldown)
+    triggers, smiling = [], []
+    start = time.perf_counter()
+    while max_frames is None or engine.frames < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frame = cv2.flip(frame, 1)
+        points = engine.process(frame)
+        fired, _ = scorer.update(points, engine.frames / fps)
+        smiling.append(scorer.smiling)
+        if fired:
+            triggers.append(engine.frames - 1)
+    elapsed = time.perf_counter() - start
+    capture.release()
+    return engine, triggers, smiling, elapsed
+
+def evaluate_smile_modes(session, labels=None, modes=SMILE_MODES, threshold=0.46, tolerance=5, max_frames=None):
+    # Trigger precision is measured against labelled smile ranges if given, otherwise
+    # against the per-frame decisions of the full refined mesh
+    results = {mode: run_session(session, mode, threshold, max_frames=max_frames) for mode in modes}
+    if labels:
+        ranges = load_labels(labels)
+        is_smile = lambda frame: any(start - tolerance <= frame <= end + tolerance for start, end in ranges)
+        reference = f"labels {labels}"
+    else:
+        reference_flags = (results["full"] if "full" in results else
+                           run_session(session, "full", threshold, max_frames=max_frames))[2]
+        is_smile = lambda frame: any(reference_flags[max(0, frame - tolerance):frame + tolerance + 1])
+        reference = "full mode"
+
+    print(f"Session {session}, trigger precision against {reference}")
+    print(f"{'mode':<6}{'mean ms':>9}{'p95 ms':>9}{'fps':>8}{'skipped':>9}{'triggers':>10}{'precision':>11}")
+    for mode, (engine, triggers, _, elapsed) in results.items():
+        mean_ms, p95_ms = engine.latency_ms()
+        correct = sum(1 for frame in triggers if is_smile(frame))
+        precision = f"{correct / len(triggers):.2f}" if triggers else "-"
+        print(f"{mode:<6}{mean_ms:>9.1f}{p95_ms:>9.1f}{engine.frames / elapsed:>8.1f}"
+              f"{engine.frames_skipped:>9}{len(triggers):>10}{precision:>11}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare smile landmark modes on a recorded session")
+    parser.add_argument("session", help="recorded video of a selfie session")
+    parser.add_argument("--labels", help="text file of 'start end' smiling frame ranges")
+    parser.add_argument("--modes", nargs="+", default=list(SMILE_MODES), choices=SMILE_MODES)
+    parser.add_argument("--threshold", type=float, default=0.46, help="smile ratio that starts a smile")
+    parser.add_argument("--max-frames", type=int)
+    args = parser.parse_args()
+
+    evaluate_smile_modes(args.session, args.labels, args.modes, args.threshold, max_frames=args.max_frames)
@@ -0,0 +1,113 @@
+# smile_replay.py
+# Logged landmark streams for tuning the smile trigger offline: a session is recorded once
+# (live with smileautoselfie.py --log-landmarks, or from a video here) and then scored with
+# any SmileScorer settings without running MediaPipe again.
+import argparse
+import time
+import cv2
+import numpy as np
+from smile_engine import SMILE_LANDMARKS, SmileLandmarkEngine, SmileScorer, smile_ratio
+
+class LandmarkLog:
+    # Per frame: timestamp, face count (-1 for a frame the engine skipped) and the points
+    def __init__(self, indices=SMILE_LANDMARKS):
+        self.indices = tuple(indices)
+        self.timestamps = []
+        self.counts = []
+        self.points = []
+
+    def append(self, timestamp, points):
+        self.timestamps.append(timestamp)
+        if points is None:
+            self.counts.append(-1)
+        else:
+            self.counts.append(len(points))
+            if len(points):
+                self.points.append(points)
+
+    def save(self, path):
+        points = (np.concatenate(self.points) if self.points
+                  else np.empty((0, len(self.indices), 3), np.float32))
+        np.savez_compressed(path, timestamps=np.array(self.timestamps, np.float64),
+                            counts=np.array(self.counts, np.int32), points=points.astype(np.float32),
+                            indices=np.array(self.indices, np.int32))
+        print(f"Landmark log of {len(self.timestamps)} frames saved as {path}")
+
+def load_log(path):
+    data = np.load(path)
+    if tuple(data["indices"]) != SMILE_LANDMARKS:
+        raise ValueError(f"{path} was logged with landmarks {tuple(data['indices'])}, expected {SMILE_LANDMARKS}")
+    return data["timestamps"], data["counts"], data["points"]
+
+def frame_ratios(counts, points, reference="face"):
+    # Widest smile ratio per frame, NaN for frames without a face, all frames at once
+    ratios = np.full(len(counts), np.nan)
+    with_faces = counts > 0
+    if with_faces.any():
+        per_face = smile_ratio(points, reference)
+        starts = np.concatenate(([0], np.cumsum(counts[with_faces])[:-1]))
+        ratios[with_faces] = np.maximum.reduceat(per_face, starts)
+    return ratios
+
+def replay(timestamps, counts, ratios, **scorer_options):
+    # Returns the frame indices where a capture would have fired
+    scorer = SmileScorer(**scorer_options)
+    fired_frames = []
+    for index, (timestamp, count, ratio) in enumerate(zip(timestamps.tolist(), counts.tolist(), ratios.tolist())):
+        if count < 0:
+            continue
+        if count == 0:
+            scorer.reset()
+            continue
+        fired, _ = scorer.update_ratio(ratio, timestamp)
+        if fired:
+            fired_frames.append(index)
+    return fired_frames
+
+def record_session(session, path, mode="fast"):
+    capture = cv2.VideoCapture(session)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    engine = SmileLandmarkEngine(mode)
+    log = LandmarkLog()
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        log.append(engine.frames / fps, engine.process(cv2.flip(frame, 1)))
+    capture.release()
+    log.save(path)
+
+def sweep(path, thresholds, reference="face", **scorer_options):
+    timestamps, counts, points = load_log(path)
+    start = time.perf_counter()
+    ratios = frame_ratios(counts, points, reference)
+    ratio_ms = (time.perf_counter() - start) * 1000
+    valid = ratios[~np.isnan(ratios)]
+    if len(valid):
+        print(f"{path}: {len(counts)} frames, smile ratio p10 {np.percentile(valid, 10):.3f}, "
+              f"p50 {np.percentile(valid, 50):.3f}, p90 {np.percentile(valid, 90):.3f} ({ratio_ms:.1f} ms)")
+    print(f"{'threshold':>10}{'captures':>10}{'frames/s':>12}  first frames")
+    for threshold in thresholds:
+        start = time.perf_counter()
+        fired = replay(timestamps, counts, ratios, threshold=threshold, reference=reference, **scorer_options)
+        elapsed = time.perf_counter() - start
+        print(f"{threshold:>10.3f}{len(fired):>10}{len(counts) / max(elapsed, 1e-9):>12.0f}  {fired[:8]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score logged smile landmark streams offline")
+    parser.add_argument("log", help=".npz landmark log")
+    parser.add_argument("--from-video", metavar="SESSION", help="first record the log from a video")
+    parser.add_argument("--mode", default="fast", help="Face Mesh mode used with --from-video")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.42, 0.44, 0.46, 0.48, 0.50])
+    parser.add_argument("--reference", default="face", choices=["face", "eyes"],
+                        help="normalize mouth width by face width or outer inter-ocular distance")
+    parser.add_argument("--hysteresis", type=float, default=0.04)
+    parser.add_argument("--alpha", type=float, default=0.3, help="EMA smoothing factor")
+    parser.add_argument("--hold", type=int, default=3, help="frames above threshold before a smile counts")
+    parser.add_argument("--cooldown", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.from_video:
+        record_session(args.from_video, args.log, args.mode)
+    sweep(args.log, args.thresholds, args.reference, hysteresis=args.hysteresis, alpha=args.alpha,
+          hold=args.hold, cooldown=args.cooldown)
@@ -1,111 +1,99 @@
+import argparse
 import cv2
-import mediapipe as mp
-import winsound
-import math
-import datetime
-import os
+import time
+from capture_writer import FORMATS, CaptureWriter
+from event_dispatch import SoundSink
+from landmarks import pixel_points
+from smile_engine import SMILE_MODES, SmileLandmarkEngine, SmileScorer, evaluate_smile_modes
+from smile_replay import LandmarkLog
 
-# Initialize MediaPipe Face Mesh
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(refine_landmarks=True)
+def smile_selfie(mode="fast", threshold=0.46, log_path=None, fmt="jpg", quality=95, png_compression=3,
+                 burst_seconds=0.0):
+    # Mouth landmarks from the selected Face Mesh mode; see smile_engine.py
+    engine = SmileLandmarkEngine(mode)
+    # Mouth width relative to face width, smoothed; fires once per stable smile onset
+    scorer = SmileScorer(threshold, cooldown=2.0)  # 2 seconds cooldown between selfies
+    log = LandmarkLog() if log_path else None
+    # Selfies are encoded, saved and announced off the capture loop
+    writer = CaptureWriter("selfies", fmt=fmt, quality=quality, png_compression=png_compression,
+                           burst_seconds=burst_seconds, sound=SoundSink(sound_file="sound.wav"))
 
-# Initialize webcam
-camera = cv2.VideoCapture(0)
+    # Initialize webcam
+    camera = cv2.VideoCapture(0)
 
-# Set camera properties for faster frame rate
-camera.set(cv2.CAP_PROP_FPS, 30)
-camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # Set camera properties for faster frame rate
+    camera.set(cv2.CAP_PROP_FPS, 30)
+    camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
-# Initialize coordinates
-x1, y1, x2, y2 = 0, 0, 0, 0
+    while True:
+        # Read frame from camera
+        ret, image = camera.read()
+        if not ret:
+            break
 
-# Create directory for selfies if it doesn't exist
-if not os.path.exists("selfies"):
-    os.makedirs("selfies")
+        # Flip image horizontally for a mirror effect
+        image = cv2.flip(image, 1)
+        fh, fw, _ = image.shape
 
-# Variable to prevent multiple rapid selfies
-last_selfie_time = 0
-selfie_cooldown = 2000  # 2 seconds cooldown between selfies
+        # None while idle frames are being skipped
+        faces = engine.process(image)
+        now = time.monotonic()
+        fired, score = scorer.update(faces, now)
+        if log:
+            log.append(now, faces)
+        # New smile and out of cooldown: take selfie (copied before anything is drawn on it)
+        writer.update(image, score, fired, now)
 
-while True:
-    # Read frame from camera
-    ret, image = camera.read()
-    if not ret:
-        break
-        
-    # Flip image horizontally for a mirror effect
-    image = cv2.flip(image, 1)
-    fh, fw, _ = image.shape
-    
-    # Convert to RGB for MediaPipe processing
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # Process the image with Face Mesh
-    output = face_mesh.process(rgb_image)
-    landmark_points = output.multi_face_landmarks
-    
-    if landmark_points:
-        landmarks = landmark_points[0].landmark
-        
-        for id, landmark in enumerate(landmarks):
-            x = int(landmark.x * fw)
-            y = int(landmark.y * fh)
-            
-            # Get left mouth corner (landmark 61)
-            if id == 61:
-                x1 = x
-                y1 = y
-                # Draw circle on left mouth corner
-                cv2.circle(image, (x, y), 3, (0, 255, 0), -1)
-                
-            # Get right mouth corner (landmark 291)
-            if id == 291:
-                x2 = x
-                y2 = y
-                # Draw circle on right mouth corner
-                cv2.circle(image, (x, y), 3, (0, 255, 0), -1)
-        
-        # Calculate distance between mouth corners
-        if x1 != 0 and y1 != 0 and x2 != 0 and y2 != 0:
-            dist = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            dist = int(dist)
-            
-            # Display distance on screen
-            cv2.putText(image, f"Smile Distance: {dist}", (10, 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            
-            # If distance is greater than threshold (smiling), take selfie
-            current_time = cv2.getTickCount()
-            if dist > 60 and (current_time - last_selfie_time) / cv2.getTickFrequency() * 1000 > selfie_cooldown:
-                # Generate timestamp for filename
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-                filename = f"selfies/selfie_{timestamp}.png"
-                
-                # Save the selfie
-                cv2.imwrite(filename, image)
-                print(f"Selfie saved as {filename}")
-                
-                # Play sound
-                try:
-                    winsound.PlaySound("sound.wav", winsound.SND_FILENAME)
-                except:
-                    print("Sound file not found or couldn't be played")
-                
-                # Update last selfie time
-                last_selfie_time = current_time
-    
-    # Display instruction
-    cv2.putText(image, "Smile to take a selfie! Press ESC to exit", 
-                (10, fh - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-    
-    # Show the image with minimal delay
-    cv2.imshow("Auto Selfie for Smiling Faces using Python", image)
-    
-    # Check for ESC key press to exit with minimal delay
-    if cv2.waitKey(1) & 0xFF == 27:  # ESC key with minimal delay
-        break
+        if faces is not None and len(faces):
+            for corners in pixel_points(faces[:, :2]):
+                for x, y in corners:
+                    cv2.circle(image, (int(x), int(y)), 3, (0, 255, 0), -1)
 
-# Release resources
-camera.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+            # Display score on screen
+            color = (0, 255, 0) if scorer.smiling else (0, 0, 255)
+            cv2.putText(image, f"Smile score: {score:.2f} / {threshold:.2f}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+        # Display instruction
+        mean_ms, _ = engine.latency_ms()
+        cv2.putText(image, f"Smile to take a selfie! Press ESC to exit ({mode}: {mean_ms:.0f} ms)",
+                    (10, fh - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+        # Show the image with minimal delay
+        cv2.imshow("Auto Selfie for Smiling Faces using Python", image)
+
+        # Check for ESC key press to exit with minimal delay
+        if cv2.waitKey(1) & 0xFF == 27:  # ESC key with minimal delay
+            break
+
+    # Release resources
+    if log:
+        log.save(log_path)
+    writer.close()
+    writer.sound.close()
+    camera.release()
+    cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auto selfie when you smile")
+    parser.add_argument("--mode", default="fast", choices=SMILE_MODES,
+                        help="full refined mesh, plain mesh, or face detection plus a mesh on the face ROI")
+    parser.add_argument("--threshold", type=float, default=0.46, help="mouth width / face width that counts as a smile")
+    parser.add_argument("--log-landmarks", metavar="PATH",
+                        help="save the landmark stream to a .npz for smile_replay.py")
+    parser.add_argument("--format", default="jpg", choices=list(FORMATS), help="selfie image format")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG/WebP quality")
+    parser.add_argument("--png-compression", type=int, default=3, help="PNG compression level 0-9")
+    parser.add_argument("--burst", type=float, default=0.0, metavar="SECONDS",
+                        help="save the best-scoring frame from this window after each smile")
+    parser.add_argument("--evaluate", metavar="SESSION",
+                        help="report per-mode latency and trigger precision on a recorded video")
+    parser.add_argument("--labels", help="'start end' smiling frame ranges for --evaluate")
+    args = parser.parse_args()
+
+    if args.evaluate:
+        evaluate_smile_modes(args.evaluate, args.labels, threshold=args.threshold)
+    else:
+        smile_selfie(args.mode, args.threshold, args.log_landmarks, args.format, args.quality,
+                     args.png_compression, args.burst)